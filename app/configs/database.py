@@ -29,6 +29,20 @@ def get_db_pool() -> asyncpg.Pool:
     return _connection_pool
 
 
+async def open_db_connection() -> asyncpg.Connection:
+    """
+    Standalone connection outside the pool, for session-level state such as
+    advisory locks that must live exactly as long as the caller holds it.
+    """
+    return await asyncpg.connect(
+        user=settings.db_user,
+        password=settings.db_pass,
+        database=settings.db_name,
+        host=settings.db_host,
+        port=settings.db_port,
+    )
+
+
 @asynccontextmanager
 async def get_db_connection():
     """Dùng connection trong async with, tự release sau khi dùng"""
@@ -43,6 +43,58 @@ class Settings(BaseSettings):
     # Backend API
     backend_api_url: str = "http://localhost:8082/api/v1"
 
+    # Shared user x product interaction matrix (UserCF, ItemCF, ALS)
+    interactions_refresh_interval: int = 60  # seconds between incremental refreshes
+    interactions_full_rebuild_interval: int = 86400  # 24 hours
+
+    # User CF
+    user_cf_refresh_interval: int = 60  # seconds between incremental refreshes
+    user_cf_full_rebuild_interval: int = 86400  # 24 hours
+    user_cf_batch_memory_mb: int = 512  # score block budget for the all-users job
+    user_cf_similarity: str = "exact"  # "exact" or "ann" (FAISS)
+    user_cf_ann_index: str = "hnsw"  # "hnsw" or "ivf"
+    user_cf_ann_hnsw_m: int = 32
+    user_cf_ann_ef_search: int = 64
+    user_cf_ann_nlist: int = 0  # 0 = 4 * sqrt(users)
+    user_cf_ann_nprobe: int = 16
+
+    # Item CF
+    item_cf_neighbours: int = 50  # top-M neighbours kept per product
+    item_cf_similarity: str = "cosine"  # "cosine" or "jaccard"
+
+    # Background rebuild jobs
+    jobs_max_concurrency: int = 1  # rebuilds running at once; the rest queue
+    jobs_history_size: int = 100  # finished jobs kept for GET /jobs/{id}
+
+    # FPGrowth association rules
+    fpgrowth_engine: str = "sparse"  # "sparse", "mlxtend" or "counters"
+    fpgrowth_workers: int = 1  # > 1 mines PFP item-group shards in a process pool
+    fpgrowth_stream_chunk_size: int = 10000  # orders per server-side cursor fetch
+    fpgrowth_rules_ttl: int = 600  # seconds before a background revalidation
+    fpgrowth_rules_cache_size: int = 8  # (min_support, min_confidence) pairs kept
+    fpgrowth_window_days: int = 0  # "counters" engine: 0 = all history
+    fpgrowth_counters_full_rebuild_interval: int = 86400  # 24 hours
+
+    # Content-based
+    content_knn_chunk_size: int = 4096  # products per FAISS search in the bulk job
+    content_index_type: str = "flat"  # "flat", "hnsw", "ivf_flat" or "ivf_pq"
+    content_hnsw_m: int = 32
+    content_hnsw_ef_search: int = 64
+    content_ivf_nlist: int = 0  # 0 = 4 * sqrt(products)
+    content_ivf_nprobe: int = 16
+    content_pq_m: int = 48  # "ivf_pq" sub-quantizers; must divide the embedding dim
+    content_pq_nbits: int = 8
+    content_embedding_dtype: str = "float32"  # "float16"/"int8": index codes are the only copy
+    content_encode_workers: int = 1  # > 1 encodes large builds in a process pool
+    content_encode_batch_size: int = 64
+    content_store_check_interval: int = 30  # seconds between checks for a newer stored version
+
+    # ALS (implicit matrix factorization)
+    als_factors: int = 64
+    als_iterations: int = 15
+    als_regularization: float = 0.01
+    als_alpha: float = 40.0  # confidence = 1 + alpha * quantity
+
     # Redis Chat Memory
     redis_host: str = "localhost"
     redis_port: int = 6379
@@ -51,6 +103,11 @@ class Settings(BaseSettings):
     chat_memory_ttl: int = 86400  # 24 hours
     max_chat_history_messages: int = 20
 
+    # Chatbot catalog search (browse_catalog tool)
+    chatbot_catalog_search: str = "backend"  # "backend" name search or "semantic" index
+    chatbot_semantic_top_n: int = 30
+    chatbot_semantic_min_score: float = 0.3  # cosine similarity; weaker hits are dropped
+
 
     # AWS Bedrock Chatbot
     aws_access_key_id_chatbot: str | None = None
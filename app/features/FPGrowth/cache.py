@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+    def __init__(self, value, version, loaded_at):
+        self.value = value
+        self.version = version
+        self.loaded_at = loaded_at
+
+
+class RulesCache:
+    """
+    Mined rules per (min_support, min_confidence), tagged with the data
+    version they were mined from.
+
+    - fresh entries (younger than ttl) are a dict lookup;
+    - stale entries are returned as-is while one background task checks the
+      data version and re-mines only if it changed;
+    - missing entries are mined once, concurrent callers await the same task;
+    - at most max_entries parameter pairs are kept (least recently used out).
+    """
+
+    def __init__(self, load_version, mine, ttl=600, max_entries=8):
+        self._load_version = load_version
+        self._mine = mine
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    async def get(self, *key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self.refresh(*key)
+
+        self._entries.move_to_end(key)
+        if time.monotonic() - entry.loaded_at >= self.ttl and key not in self._inflight:
+            task = self._start(key)
+            task.add_done_callback(_report_background_error)
+        return entry.value
+
+    async def refresh(self, *key):
+        """Revalidate key now (re-mining if the data changed) and return its value."""
+        task = self._inflight.get(key) or self._start(key)
+        entry = await asyncio.shield(task)
+        return entry.value
+
+    def _start(self, key):
+        task = asyncio.create_task(self._load(key))
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, key):
+        try:
+            version = await self._load_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                entry.loaded_at = time.monotonic()
+                return entry
+
+            value = await self._mine(*key)
+            entry = _Entry(value, version, time.monotonic())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            {
+                "min_support": key[0],
+                "min_confidence": key[1],
+                "version": str(entry.version),
+                "age_seconds": now - entry.loaded_at,
+            }
+            for key, entry in self._entries.items()
+        ]
+
+
+def _report_background_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background rules refresh failed: {task.exception()!r}")
@@ -0,0 +1,332 @@
+import asyncio
+import fcntl
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy import sparse
+
+from app.features.FPGrowth.rule_index import RuleIndex
+from app.features.FPGrowth.sparse_miner import encode_baskets
+from app.shares.id_index import IdIndex
+
+BASKETS_QUERY = """
+    SELECT o.order_id, MAX(o.created_at) AS created_at,
+           array_agg(DISTINCT p.product_id::text) AS products
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
+    JOIN products p ON p.product_id = pv.product_id
+    WHERE p.status = 'APPROVED'{and_where}
+    GROUP BY o.order_id;
+"""
+
+_COUNTER_KEYS = {
+    "item_ids",
+    "item_counts",
+    "pair_data",
+    "pair_indices",
+    "pair_indptr",
+    "n_transactions",
+    "watermark",
+}
+
+
+class CooccurrenceCounters:
+    """
+    Per-product order counts and pair co-occurrence counts (upper triangle,
+    a < b) over a set of orders. Adding or expiring orders only touches the
+    counts of those orders, and pairwise rules are read straight off the
+    counters.
+    """
+
+    def __init__(
+        self,
+        items: IdIndex,
+        item_counts: np.ndarray,
+        pairs: sparse.csr_matrix,
+        n_transactions=0,
+        watermark=None,
+    ):
+        self.items = items
+        self.item_counts = item_counts
+        self.pairs = pairs
+        self.n_transactions = n_transactions
+        self.watermark = watermark
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            IdIndex(),
+            np.zeros(0, dtype=np.int64),
+            sparse.csr_matrix((0, 0), dtype=np.int64),
+        )
+
+    def with_baskets(self, added, removed=(), watermark=None):
+        """
+        New counters with the baskets (lists of product ids) in added counted
+        and those in removed subtracted. Existing positions are kept and new
+        ids appended, so snapshots already handed out stay valid.
+        """
+        items = self.items.copy()
+        _, added_baskets = encode_baskets(added, items, dtype=np.int64)
+        _, removed_baskets = encode_baskets(removed, items, dtype=np.int64)
+        n = len(items)
+
+        item_counts = np.zeros(n, dtype=np.int64)
+        item_counts[: len(self.item_counts)] = self.item_counts
+        item_counts[: added_baskets.shape[1]] += _column_counts(added_baskets)
+        item_counts[: removed_baskets.shape[1]] -= _column_counts(removed_baskets)
+
+        pairs = (
+            _resize(self.pairs, n)
+            + _resize(_pair_counts(added_baskets), n)
+            - _resize(_pair_counts(removed_baskets), n)
+        ).tocsr()
+        # Expired orders are re-read under today's APPROVED filter; never go
+        # below zero for products that were approved after being counted.
+        np.maximum(item_counts, 0, out=item_counts)
+        pairs.data[pairs.data < 0] = 0
+        pairs.eliminate_zeros()
+
+        return CooccurrenceCounters(
+            items,
+            item_counts,
+            pairs,
+            self.n_transactions + len(added) - len(removed),
+            watermark if watermark is not None else self.watermark,
+        )
+
+    def rules(self, min_support=0.05, min_confidence=0.2) -> RuleIndex:
+        """
+        RuleIndex of every pairwise rule a -> c with support(a, c) >=
+        min_support and confidence count(a, c) / count(a) >= min_confidence.
+        """
+        if self.n_transactions <= 0:
+            return RuleIndex.from_pairs(self.items, [], [], [])
+
+        coo = self.pairs.tocoo()
+        keep = coo.data / self.n_transactions >= min_support
+        a, c, n_ac = coo.row[keep], coo.col[keep], coo.data[keep].astype(np.float64)
+
+        antecedents = np.concatenate([a, c])
+        consequents = np.concatenate([c, a])
+        confidence = np.concatenate([n_ac, n_ac]) / self.item_counts[antecedents]
+        strong = confidence >= min_confidence
+        return RuleIndex.from_pairs(
+            self.items, antecedents[strong], consequents[strong], confidence[strong]
+        )
+
+    def save(self, path, **state):
+        """
+        Write the counters (plus extra scalar state) to path atomically.
+        Every worker persists to the same path: each writes its own temp
+        file, and writers take turns on a flock of path.lock.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        pairs = self.pairs.tocsr()
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(
+                        f,
+                        item_ids=np.array(self.items.ids, dtype=str),
+                        item_counts=self.item_counts,
+                        pair_data=pairs.data,
+                        pair_indices=pairs.indices,
+                        pair_indptr=pairs.indptr,
+                        n_transactions=self.n_transactions,
+                        watermark=self.watermark.isoformat() if self.watermark else "",
+                        **state,
+                    )
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    @classmethod
+    def load(cls, path):
+        """(counters, extra state dict) as written by save."""
+        with np.load(path) as data:
+            items = IdIndex(data["item_ids"].tolist())
+            n = len(items)
+            pairs = sparse.csr_matrix(
+                (data["pair_data"], data["pair_indices"], data["pair_indptr"]),
+                shape=(n, n),
+            )
+            watermark = str(data["watermark"])
+            counters = cls(
+                items,
+                data["item_counts"],
+                pairs,
+                int(data["n_transactions"]),
+                datetime.fromisoformat(watermark) if watermark else None,
+            )
+            state = {
+                key: data[key].item() for key in data.files if key not in _COUNTER_KEYS
+            }
+        return counters, state
+
+
+def _column_counts(baskets):
+    return np.asarray(baskets.sum(axis=0)).ravel().astype(np.int64)
+
+
+def _pair_counts(baskets):
+    return sparse.triu(baskets.T @ baskets, k=1)
+
+
+def _resize(matrix, n):
+    coo = matrix.tocoo()
+    return sparse.csr_matrix((coo.data, (coo.row, coo.col)), shape=(n, n), dtype=np.int64)
+
+
+async def fetch_baskets(conn, after=None, until=None):
+    """Distinct APPROVED product ids per order with after < created_at <= until."""
+    conditions, args = [], []
+    if after is not None:
+        args.append(after)
+        conditions.append(f"o.created_at > ${len(args)}")
+    if until is not None:
+        args.append(until)
+        conditions.append(f"o.created_at <= ${len(args)}")
+    and_where = "".join(f"\n      AND {condition}" for condition in conditions)
+    return await conn.fetch(BASKETS_QUERY.format(and_where=and_where), *args)
+
+
+class CooccurrenceStore:
+    """
+    CooccurrenceCounters persisted to disk and kept current from an
+    orders.created_at watermark.
+
+    A refresh reads only orders created after the watermark and, with a
+    sliding window, subtracts the orders that fell out of it (window_days
+    before the newest order), so its cost follows the new and expired
+    orders rather than the whole history. A periodic full rebuild drops
+    products that left the APPROVED status.
+    """
+
+    def __init__(self, pool, path, window_days=0, full_rebuild_interval=86400):
+        self.pool = pool
+        self.path = path
+        self.window_days = window_days
+        self.full_rebuild_interval = full_rebuild_interval
+        self.current = None
+        self.last_full_rebuild_at = None
+        self.last_refresh_at = None
+        self.last_refresh_seconds = None
+        self.last_refresh_orders = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> CooccurrenceCounters:
+        if self.current is None:
+            async with self._lock:
+                if self.current is None:
+                    await self._update(full=False)
+        return self.current
+
+    async def refresh(self, full=False) -> CooccurrenceCounters:
+        """Fold in orders since the watermark (or recount everything) and persist."""
+        async with self._lock:
+            await self._update(full=full)
+        return self.current
+
+    def window_start(self, watermark):
+        if not self.window_days or watermark is None:
+            return None
+        return watermark - timedelta(days=self.window_days)
+
+    async def _update(self, full):
+        start = time.perf_counter()
+        if self.current is None and not full:
+            await asyncio.to_thread(self._load_persisted)
+        full = (
+            full
+            or self.current is None
+            or self.current.watermark is None
+            or self._needs_full_rebuild()
+        )
+
+        expired = []
+        async with self.pool.acquire() as conn:
+            if full:
+                base = CooccurrenceCounters.empty()
+                last_order = await conn.fetchval("SELECT MAX(created_at) FROM orders")
+                added = await fetch_baskets(conn, after=self.window_start(last_order))
+            else:
+                base = self.current
+                added = await fetch_baskets(conn, after=base.watermark)
+            watermark = max((row["created_at"] for row in added), default=base.watermark)
+
+            old_start = self.window_start(base.watermark)
+            new_start = self.window_start(watermark)
+            if not full and new_start is not None and watermark > base.watermark:
+                # Only orders already counted (<= the old watermark) can expire.
+                expired = await fetch_baskets(
+                    conn, after=old_start, until=min(new_start, base.watermark)
+                )
+                added = [row for row in added if row["created_at"] > new_start]
+
+        if full or watermark != base.watermark:
+            self.current = await asyncio.to_thread(
+                base.with_baskets,
+                [row["products"] for row in added],
+                [row["products"] for row in expired],
+                watermark,
+            )
+            if full:
+                self.last_full_rebuild_at = time.time()
+            await asyncio.to_thread(
+                self.current.save,
+                self.path,
+                window_days=self.window_days,
+                last_full_rebuild_at=self.last_full_rebuild_at,
+            )
+
+        self.last_refresh_at = time.time()
+        self.last_refresh_seconds = time.perf_counter() - start
+        self.last_refresh_orders = len(added) + len(expired)
+
+    def _load_persisted(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            counters, state = CooccurrenceCounters.load(self.path)
+        except Exception as e:
+            print(f"Ignoring unreadable co-occurrence counters {self.path}: {e!r}")
+            return
+        if state.get("window_days") != self.window_days:
+            # Counted over a different window; recount from scratch.
+            return
+        self.current = counters
+        self.last_full_rebuild_at = state.get("last_full_rebuild_at")
+
+    def _needs_full_rebuild(self):
+        return (
+            self.last_full_rebuild_at is None
+            or time.time() - self.last_full_rebuild_at >= self.full_rebuild_interval
+        )
+
+    def stats(self):
+        if self.current is None:
+            return {"loaded": False}
+        now = time.time()
+        return {
+            "loaded": True,
+            "orders": self.current.n_transactions,
+            "products": len(self.current.items),
+            "pairs": int(self.current.pairs.nnz),
+            "window_days": self.window_days,
+            "watermark": (
+                self.current.watermark.isoformat() if self.current.watermark else None
+            ),
+            "staleness_seconds": now - self.last_refresh_at,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "last_refresh_orders": self.last_refresh_orders,
+            "since_full_rebuild_seconds": now - self.last_full_rebuild_at,
+        }
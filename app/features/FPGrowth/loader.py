@@ -0,0 +1,88 @@
+import numpy as np
+from scipy import sparse
+
+from app.features.FPGrowth.sparse_miner import basket_matrix
+from app.shares.id_index import IdIndex
+
+BASKETS_QUERY = """
+    SELECT array_agg(DISTINCT p.product_id::text) AS products
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
+    JOIN products p ON p.product_id = pv.product_id
+    WHERE p.status = 'APPROVED'
+    GROUP BY o.order_id;
+"""
+
+
+class Baskets:
+    """
+    Orders encoded for mining: a 0/1 CSR matrix of the multi-item baskets,
+    plus per-product order counts and the order total taken over every
+    basket (single-item ones included) so supports match mining all orders.
+    """
+
+    def __init__(
+        self, items: IdIndex, matrix: sparse.csr_matrix, item_counts, n_transactions
+    ):
+        self.items = items
+        self.matrix = matrix
+        self.item_counts = item_counts
+        self.n_transactions = n_transactions
+
+
+class BasketEncoder:
+    """
+    Builds Baskets chunk by chunk. Product ids are interned as they arrive
+    and only int32 index arrays outlive a chunk; baskets with fewer than
+    min_items products only bump the per-product counts.
+    """
+
+    def __init__(self, min_items=2):
+        self.min_items = min_items
+        self.items = IdIndex()
+        self.n_transactions = 0
+        self._indices = []
+        self._lengths = []
+        self._singles = []
+
+    def add(self, chunk):
+        """Encode a list of baskets (lists of product ids)."""
+        lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=len(chunk))
+        indices = self.items.add_many(item for basket in chunk for item in basket)
+        kept = lengths >= self.min_items
+        in_kept = np.repeat(kept, lengths)
+
+        self._indices.append(indices[in_kept].astype(np.int32))
+        self._lengths.append(lengths[kept])
+        self._singles.append(indices[~in_kept].astype(np.int32))
+        self.n_transactions += len(chunk)
+
+    def finish(self) -> Baskets:
+        n_items = len(self.items)
+        indices = np.concatenate([np.empty(0, dtype=np.int32), *self._indices])
+        lengths = np.concatenate([np.empty(0, dtype=np.int64), *self._lengths])
+        singles = np.concatenate([np.empty(0, dtype=np.int32), *self._singles])
+        self._indices, self._lengths, self._singles = [], [], []
+
+        matrix = basket_matrix(indices, np.concatenate([[0], np.cumsum(lengths)]), n_items)
+        item_counts = np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64)
+        item_counts += np.bincount(singles, minlength=n_items)
+        return Baskets(self.items, matrix, item_counts, self.n_transactions)
+
+
+def encode_chunks(chunks, min_items=2) -> Baskets:
+    encoder = BasketEncoder(min_items)
+    for chunk in chunks:
+        encoder.add(chunk)
+    return encoder.finish()
+
+
+async def stream_baskets(conn, chunk_size=10000, min_items=2) -> Baskets:
+    """Baskets of every order, read through a server-side cursor chunk_size rows at a time."""
+    encoder = BasketEncoder(min_items)
+    async with conn.transaction():
+        cursor = await conn.cursor(BASKETS_QUERY)
+        while rows := await cursor.fetch(chunk_size):
+            encoder.add([row["products"] for row in rows])
+    return encoder.finish()
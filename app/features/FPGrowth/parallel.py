@@ -0,0 +1,138 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from app.features.FPGrowth.sparse_miner import (
+    association_rules_from_itemsets,
+    encode_baskets,
+    frequent_itemsets,
+    with_item_counts,
+)
+
+
+def partition_baskets(baskets, min_support, n_groups, n_transactions=None):
+    """
+    PFP group-dependent shards (Li et al., 2008).
+
+    Frequent items are ranked by descending count (the F-list) and dealt
+    round-robin into n_groups groups. For every basket and group, the basket
+    prefix up to its last item of that group goes to the group's shard, so
+    each itemset whose least frequent item is in group g is counted in full
+    by shard g alone.
+
+    Returns (ranked item columns, group of each rank, shard CSR matrices
+    over ranks).
+    """
+    n_rows = baskets.shape[0]
+    if n_transactions is None:
+        n_transactions = n_rows
+    counts = np.asarray(baskets.sum(axis=0)).ravel()
+    frequent = np.flatnonzero(counts / max(n_transactions, 1) >= min_support)
+    ranked = frequent[np.lexsort((frequent, -counts[frequent]))]
+    groups = np.arange(len(ranked)) % n_groups
+
+    X = baskets[:, ranked].tocsr()
+    X.sort_indices()
+    row_of = np.repeat(np.arange(n_rows), np.diff(X.indptr))
+    group_of = groups[X.indices]
+
+    shards = []
+    for g in range(n_groups):
+        # Items are sorted by rank, so the last group-g entry of a row bounds its prefix.
+        last = np.full(n_rows, -1, dtype=np.int64)
+        in_group = np.flatnonzero(group_of == g)
+        np.maximum.at(last, row_of[in_group], in_group)
+        keep = np.arange(len(X.indices)) <= last[row_of]
+        shards.append(
+            sparse.csr_matrix(
+                (X.data[keep], (row_of[keep], X.indices[keep])),
+                shape=X.shape,
+            )
+        )
+    return ranked, groups, shards
+
+
+def _mine_shard(shard, group, groups, min_support, n_transactions, max_len):
+    levels = frequent_itemsets(
+        shard, min_support, max_len=max_len, n_transactions=n_transactions
+    )
+    owned = []
+    for sets, counts in levels:
+        mine = groups[sets.max(axis=1)] == group
+        if mine.any():
+            owned.append((sets[mine], counts[mine]))
+    return owned
+
+
+def parallel_frequent_itemsets(
+    baskets, min_support, workers, max_len=None, n_transactions=None
+):
+    """
+    frequent_itemsets computed shard by shard across a process pool and
+    merged. Same result as the single-process miner.
+    """
+    if n_transactions is None:
+        n_transactions = baskets.shape[0]
+    if n_transactions == 0:
+        return []
+    ranked, groups, shards = partition_baskets(
+        baskets, min_support, workers, n_transactions=n_transactions
+    )
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(
+                _mine_shard, shard, g, groups, min_support, n_transactions, max_len
+            )
+            for g, shard in enumerate(shards)
+        ]
+        results = [future.result() for future in futures]
+
+    by_size = {}
+    for owned in results:
+        for sets, counts in owned:
+            by_size.setdefault(sets.shape[1], []).append((ranked[sets], counts))
+
+    levels = []
+    for size in sorted(by_size):
+        sets = np.vstack([s for s, _ in by_size[size]])
+        counts = np.concatenate([c for _, c in by_size[size]])
+        # Items ascending within a set and sets in lexicographic order, as the
+        # single-process miner returns them.
+        sets.sort(axis=1)
+        order = np.lexsort(sets.T[::-1])
+        levels.append((sets[order], counts[order]))
+    return levels
+
+
+def mine_parallel_rules(
+    transactions, min_support=0.05, min_confidence=0.2, workers=2, max_len=None
+):
+    """mine_sparse_rules with the itemset mining spread over `workers` processes."""
+    items, baskets = encode_baskets(transactions)
+    levels = parallel_frequent_itemsets(baskets, min_support, workers, max_len=max_len)
+    return association_rules_from_itemsets(
+        levels, items, baskets.shape[0], min_confidence
+    )
+
+
+def mine_parallel_basket_rules(
+    baskets, min_support=0.05, min_confidence=0.2, workers=2, max_len=None
+):
+    """mine_parallel_rules over a loader.Baskets (single-item orders dropped)."""
+    levels = parallel_frequent_itemsets(
+        baskets.matrix,
+        min_support,
+        workers,
+        max_len=max_len,
+        n_transactions=baskets.n_transactions,
+    )
+    levels = with_item_counts(
+        levels, baskets.item_counts, baskets.n_transactions, min_support
+    )
+    return association_rules_from_itemsets(
+        levels, baskets.items, baskets.n_transactions, min_confidence
+    )
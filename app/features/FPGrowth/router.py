@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Request
 
+from app.shares.jobs import job_accepted
+
 router = APIRouter(prefix="/recommend/fpgrowth", tags=["FPGrowth Recommendation"])
 
 
@@ -31,12 +33,23 @@ async def update_suggested_products(
         if lazy_model is None:
             return {"error": "FPGrowthRecommender model not initialized"}
 
-        recommender_fpg = await lazy_model.get()
+        async def run(job):
+            recommender_fpg = await lazy_model.get()
+            await recommender_fpg.update_suggested_products_in_db(
+                top_n=top_n,
+                min_support=min_support,
+                min_confidence=min_confidence,
+                progress=job.report,
+            )
 
-        await recommender_fpg.update_suggested_products_in_db(
-            top_n=top_n, min_support=min_support, min_confidence=min_confidence
+        job, created = await request.app.state.jobs.submit(
+            "fpgrowth_suggestions",
+            run,
+            top_n=top_n,
+            min_support=min_support,
+            min_confidence=min_confidence,
         )
-        return {"status": "success", "message": "Updated all suggested products in DB."}
+        return job_accepted(job, created)
     except Exception as e:
         return {
             "error": "FPGrowthRecommender not available, database not ready",
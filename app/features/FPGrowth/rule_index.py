@@ -0,0 +1,102 @@
+import numpy as np
+from scipy import sparse
+
+from app.shares.id_index import IdIndex
+
+
+class RuleIndex:
+    """
+    Association rules compiled into a product × product CSR matrix where
+    entry (a, c) is the summed confidence of every rule with a in its
+    antecedents and c in its consequents.
+
+    Looking up one product reads only its row; the whole-catalog top-N is a
+    single sort over the non-zeros. Ties are broken by first appearance of
+    the consequent in the rules.
+    """
+
+    def __init__(self, items: IdIndex, scores: sparse.csr_matrix):
+        self.items = items
+        self.scores = scores
+
+    @classmethod
+    def from_pairs(cls, items: IdIndex, antecedents, consequents, confidence):
+        """Build from parallel arrays of (antecedent, consequent, confidence)."""
+        antecedents = np.asarray(antecedents, dtype=np.int64)
+        consequents = np.asarray(consequents, dtype=np.int64)
+        keep = antecedents != consequents
+        scores = sparse.csr_matrix(
+            (
+                np.asarray(confidence, dtype=np.float64)[keep],
+                (antecedents[keep], consequents[keep]),
+            ),
+            shape=(len(items), len(items)),
+        )
+        scores.sum_duplicates()
+        return cls(items, scores)
+
+    @classmethod
+    def from_rules(cls, rules):
+        """Compile an association_rules DataFrame (frozenset antecedents/consequents)."""
+        items = IdIndex()
+        if rules is None or len(rules) == 0:
+            return cls.from_pairs(items, [], [], [])
+
+        antecedents = rules["antecedents"].tolist()
+        consequents = rules["consequents"].tolist()
+        a_len = np.fromiter(map(len, antecedents), dtype=np.int64, count=len(antecedents))
+        c_len = np.fromiter(map(len, consequents), dtype=np.int64, count=len(consequents))
+
+        # Intern in rule order so ids follow first appearance.
+        a_items = np.empty(a_len.sum(), dtype=np.int64)
+        c_items = np.empty(c_len.sum(), dtype=np.int64)
+        a_pos = c_pos = 0
+        for ante, cons in zip(antecedents, consequents):
+            for item in ante:
+                a_items[a_pos] = items.add(item)
+                a_pos += 1
+            for item in cons:
+                c_items[c_pos] = items.add(item)
+                c_pos += 1
+
+        # Cross every antecedent item of a rule with each of its consequents.
+        c_start = np.concatenate([[0], np.cumsum(c_len)[:-1]])
+        a_rule = np.repeat(np.arange(len(a_len)), a_len)
+        fan_out = c_len[a_rule]
+        pair_rule = np.repeat(a_rule, fan_out)
+        pair_start = np.repeat(np.cumsum(fan_out) - fan_out, fan_out)
+        offset = np.arange(fan_out.sum()) - pair_start
+
+        return cls.from_pairs(
+            items,
+            np.repeat(a_items, fan_out),
+            c_items[c_start[pair_rule] + offset],
+            rules["confidence"].to_numpy()[pair_rule],
+        )
+
+    def __len__(self):
+        return self.scores.nnz
+
+    def recommend(self, product_id, top_n=5):
+        row = self.items.get(str(product_id))
+        if row is None:
+            return []
+        start, end = self.scores.indptr[row], self.scores.indptr[row + 1]
+        cols, vals = self.scores.indices[start:end], self.scores.data[start:end]
+        order = np.lexsort((cols, -np.round(vals, 12)))[:top_n]
+        return [{"product_id": self.items[c]} for c in cols[order]]
+
+    def top_n_all(self, top_n=5):
+        """(antecedent, consequent) index arrays of every product's top-N."""
+        coo = self.scores.tocoo()
+        order = np.lexsort((coo.col, -np.round(coo.data, 12), coo.row))
+        rows, cols = coo.row[order], coo.col[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+        keep = rank < top_n
+        return rows[keep], cols[keep]
+
+    def iter_suggestions(self, top_n=5):
+        """Yield (product_id, suggested_product_id) for the whole catalog."""
+        rows, cols = self.top_n_all(top_n)
+        ids = self.items.ids
+        return zip(map(ids.__getitem__, rows), map(ids.__getitem__, cols))
@@ -1,11 +1,49 @@
+import asyncio
+import os
+
 import pandas as pd
 from mlxtend.frequent_patterns import fpgrowth, association_rules
 from mlxtend.preprocessing import TransactionEncoder
 
+from app.configs.settings import settings
+from app.features.FPGrowth.cache import RulesCache
+from app.features.FPGrowth.counters import CooccurrenceStore
+from app.features.FPGrowth.loader import stream_baskets
+from app.features.FPGrowth.parallel import mine_parallel_basket_rules, mine_parallel_rules
+from app.features.FPGrowth.rule_index import RuleIndex
+from app.features.FPGrowth.sparse_miner import mine_basket_rules, mine_sparse_rules
+from app.shares.jobs import no_progress
+from app.shares.publish import publish_table
+
+DATA_VERSION_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM orders) AS orders,
+        (SELECT MAX(created_at) FROM orders) AS last_order,
+        -- A hash of the approved ids, not a count: one product delisted and
+        -- another approved in the same window must still change the version.
+        (
+            SELECT md5(string_agg(product_id::text, ',' ORDER BY product_id))
+            FROM products
+            WHERE status = 'APPROVED'
+        ) AS approved_products;
+"""
+
 
 class FPGrowthRecommender:
     def __init__(self, pool):
         self.pool = pool
+        self.rules_cache = RulesCache(
+            self.get_data_version,
+            self._mine_cached_rules,
+            ttl=settings.fpgrowth_rules_ttl,
+            max_entries=settings.fpgrowth_rules_cache_size,
+        )
+        self.counters = CooccurrenceStore(
+            pool,
+            os.path.join(settings.model_dir, "fpgrowth", "cooccurrence.npz"),
+            window_days=settings.fpgrowth_window_days,
+            full_rebuild_interval=settings.fpgrowth_counters_full_rebuild_interval,
+        )
 
     @classmethod
     async def from_pretrained(cls, pool=None):
@@ -33,7 +71,81 @@ class FPGrowthRecommender:
             )
             return [row["products"] for row in rows]
 
+    async def get_baskets(self):
+        """Every order streamed into a compact Baskets matrix (see loader)."""
+        async with self.pool.acquire() as conn:
+            return await stream_baskets(
+                conn, chunk_size=settings.fpgrowth_stream_chunk_size
+            )
+
+    async def get_data_version(self):
+        """Cheap fingerprint of the order/product data the rules are mined from."""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(DATA_VERSION_QUERY)
+        return (row["orders"], row["last_order"], row["approved_products"])
+
+    async def _mine_cached_rules(self, min_support, min_confidence):
+        if settings.fpgrowth_engine == "counters":
+            counters = await self.counters.refresh()
+            if counters.n_transactions <= 0:
+                return None
+            return await asyncio.to_thread(
+                counters.rules, min_support, min_confidence
+            )
+
+        if settings.fpgrowth_engine == "sparse":
+            baskets = await self.get_baskets()
+            if baskets.n_transactions == 0:
+                return None
+            return await asyncio.to_thread(
+                self._mine_basket_index, baskets, min_support, min_confidence
+            )
+
+        transactions = await self.get_transactions()
+        if not transactions:
+            return None
+        return await asyncio.to_thread(
+            self._mine_rule_index, transactions, min_support, min_confidence
+        )
+
+    def _mine_rule_index(self, transactions, min_support, min_confidence):
+        return RuleIndex.from_rules(
+            self.mine_rules(transactions, min_support, min_confidence)
+        )
+
+    def _mine_basket_index(self, baskets, min_support, min_confidence):
+        if settings.fpgrowth_workers > 1:
+            rules = mine_parallel_basket_rules(
+                baskets,
+                min_support,
+                min_confidence,
+                workers=settings.fpgrowth_workers,
+            )
+        else:
+            rules = mine_basket_rules(baskets, min_support, min_confidence)
+        return RuleIndex.from_rules(rules)
+
+    async def get_rules(self, min_support=0.05, min_confidence=0.2, refresh=False):
+        """
+        Compiled RuleIndex for the thresholds, served from the cache.
+        refresh=True waits for a revalidation (re-mining only if the data
+        changed).
+        """
+        if refresh:
+            return await self.rules_cache.refresh(min_support, min_confidence)
+        return await self.rules_cache.get(min_support, min_confidence)
+
     def mine_rules(self, transactions, min_support=0.05, min_confidence=0.2):
+        if settings.fpgrowth_engine == "sparse":
+            if settings.fpgrowth_workers > 1:
+                return mine_parallel_rules(
+                    transactions,
+                    min_support,
+                    min_confidence,
+                    workers=settings.fpgrowth_workers,
+                )
+            return mine_sparse_rules(transactions, min_support, min_confidence)
+
         te = TransactionEncoder()
         te_ary = te.fit(transactions).transform(transactions)
         df = pd.DataFrame(te_ary, columns=te.columns_)
@@ -47,18 +159,11 @@ class FPGrowthRecommender:
     def recommend_from_rules(self, product_id, rules, top_n=5):
         """
         Lấy top-N gợi ý cho product_id dựa trên rules.
+        rules is a RuleIndex or an association_rules DataFrame.
         """
-        target_rules = rules[
-            rules["antecedents"].apply(lambda x: product_id in list(x))
-        ]
-        rec_scores = {}
-        for _, row in target_rules.iterrows():
-            for cons in row["consequents"]:
-                if cons != product_id:
-                    rec_scores[cons] = rec_scores.get(cons, 0) + row["confidence"]
-
-        top_recs = sorted(rec_scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
-        return [{"product_id": rid} for rid, _ in top_recs]
+        if not isinstance(rules, RuleIndex):
+            rules = RuleIndex.from_rules(rules)
+        return rules.recommend(product_id, top_n)
 
     async def recommend(
         self,
@@ -68,42 +173,29 @@ class FPGrowthRecommender:
         min_confidence: float = 0.2,
     ):
         """Recommend products based on FPGrowth rules."""
-        transactions = await self.get_transactions()
-        if not transactions:
+        rules = await self.get_rules(min_support, min_confidence)
+        if rules is None:
             return []
 
-        rules = self.mine_rules(transactions, min_support, min_confidence)
-
         return self.recommend_from_rules(product_id, rules, top_n)
 
     async def update_suggested_products_in_db(
-        self, top_n=5, min_support=0.05, min_confidence=0.2
+        self, top_n=5, min_support=0.05, min_confidence=0.2, progress=no_progress
     ):
         """update all suggested products in DB"""
 
-        transactions = await self.get_transactions()
-        if not transactions:
+        progress(0.0, "mining rules")
+        rules = await self.get_rules(min_support, min_confidence, refresh=True)
+        if rules is None:
             return
 
-        rules = self.mine_rules(transactions, min_support, min_confidence)
-
+        progress(0.8, "writing suggestions")
         async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute("TRUNCATE TABLE product_suggestions")
-
-                rows = await conn.fetch("SELECT product_id FROM products")
-                all_products = [row["product_id"] for row in rows]
-
-                for pid in all_products:
-                    recs = self.recommend_from_rules(str(pid), rules, top_n)
-                    for r in recs:
-                        await conn.execute(
-                            """
-                            INSERT INTO product_suggestions (product_id, suggested_product_id)
-                            VALUES ($1, $2)
-                        """,
-                            str(pid),
-                            str(r["product_id"]),
-                        )
+            await publish_table(
+                conn,
+                "product_suggestions",
+                ["product_id", "suggested_product_id"],
+                rules.iter_suggestions(top_n),
+            )
 
         print("Updated all suggested products in DB successfully.")
@@ -0,0 +1,200 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from app.shares.id_index import IdIndex
+
+RULE_COLUMNS = [
+    "antecedents",
+    "consequents",
+    "antecedent support",
+    "consequent support",
+    "support",
+    "confidence",
+    "lift",
+    "leverage",
+    "conviction",
+]
+
+
+def basket_matrix(indices, indptr, n_items, dtype=np.int32):
+    """0/1 CSR of baskets given as item positions and row pointers."""
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=dtype), indices, indptr),
+        shape=(len(indptr) - 1, n_items),
+    )
+    # A product bought twice in one order still counts once.
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def encode_baskets(transactions, items=None, dtype=np.int32):
+    """
+    Intern product ids and return (items, transactions × items 0/1 CSR).
+    With an existing IdIndex, known ids keep their positions and new ones
+    are appended to it.
+    """
+    items = IdIndex() if items is None else items
+    indptr = np.zeros(len(transactions) + 1, dtype=np.int64)
+    indices = []
+    for row, basket in enumerate(transactions):
+        indices.extend(items.add(item) for item in basket)
+        indptr[row + 1] = len(indices)
+
+    matrix = basket_matrix(
+        np.asarray(indices, dtype=np.int64), indptr, len(items), dtype=dtype
+    )
+    return items, matrix
+
+
+def frequent_itemsets(baskets, min_support, max_len=None, n_transactions=None):
+    """
+    Level-wise frequent itemsets over a 0/1 CSR basket matrix. Supports are
+    taken over n_transactions (defaults to the number of rows).
+
+    Each level keeps one indicator column per frequent k-itemset; one sparse
+    product with the basket matrix counts every (k+1)-extension at once,
+    and extensions are only taken with items after the itemset's last one
+    so each itemset is produced exactly once.
+
+    Returns a list of (itemsets, counts) per level where itemsets is an
+    (m, k) array of column ids.
+    """
+    if n_transactions is None:
+        n_transactions = baskets.shape[0]
+    if n_transactions == 0:
+        return []
+
+    counts = np.asarray(baskets.sum(axis=0)).ravel()
+    frequent = np.flatnonzero(counts / n_transactions >= min_support)
+    if len(frequent) == 0:
+        return []
+
+    X = baskets[:, frequent].tocsc()
+    levels = [(frequent[:, None], counts[frequent])]
+    local_sets = np.arange(len(frequent))[:, None]
+    indicators = X
+
+    while max_len is None or local_sets.shape[1] < max_len:
+        extended = (indicators.T @ X).tocoo()
+        rows, cols, n = extended.row, extended.col, extended.data
+        keep = (cols > local_sets[rows, -1]) & (n / n_transactions >= min_support)
+        if not keep.any():
+            break
+        rows, cols, n = rows[keep], cols[keep], n[keep]
+        order = np.lexsort((cols, rows))
+        rows, cols, n = rows[order], cols[order], n[order]
+
+        local_sets = np.hstack([local_sets[rows], cols[:, None]])
+        indicators = _extend_indicators(indicators, X, rows, cols)
+        levels.append((frequent[local_sets], n.astype(np.int64)))
+
+    return levels
+
+
+def _extend_indicators(indicators, X, rows, cols, block=64):
+    # Chunked so only `block` copied parent columns are alive at once.
+    blocks = [
+        indicators[:, rows[start : start + block]].multiply(X[:, cols[start : start + block]])
+        for start in range(0, len(rows), block)
+    ]
+    return sparse.hstack(blocks, format="csc")
+
+
+def with_item_counts(levels, item_counts, n_transactions, min_support):
+    """
+    Replace level 1 with supports from item_counts, for baskets encoded
+    without their single-item orders. Those orders only add to level 1: any
+    larger itemset is at most as frequent as its items among the rest.
+    """
+    counts = np.asarray(item_counts, dtype=np.int64)
+    frequent = np.flatnonzero(counts / n_transactions >= min_support)
+    if len(frequent) == 0:
+        return []
+    return [(frequent[:, None], counts[frequent])] + levels[1:]
+
+
+def association_rules_from_itemsets(levels, items, n_transactions, min_confidence):
+    """
+    Rules A -> C for every frequent itemset split into two non-empty parts,
+    with the columns of mlxtend's association_rules (confidence metric).
+    """
+    support_of = {}
+    for sets, counts in levels:
+        support_of.update(zip(map(tuple, sets.tolist()), (counts / n_transactions).tolist()))
+
+    antecedents, consequents = [], []
+    a_support, c_support, support = [], [], []
+    for sets, counts in levels[1:]:
+        k = sets.shape[1]
+        set_support = (counts / n_transactions).tolist()
+        rows = sets.tolist()
+        for size in range(1, k):
+            for a_pos in combinations(range(k), size):
+                c_pos = [p for p in range(k) if p not in a_pos]
+                for row, s in zip(rows, set_support):
+                    a = tuple(row[p] for p in a_pos)
+                    c = tuple(row[p] for p in c_pos)
+                    antecedents.append(a)
+                    consequents.append(c)
+                    a_support.append(support_of[a])
+                    c_support.append(support_of[c])
+                    support.append(s)
+
+    a_support = np.asarray(a_support, dtype=np.float64)
+    c_support = np.asarray(c_support, dtype=np.float64)
+    support = np.asarray(support, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        confidence = support / a_support
+        keep = np.flatnonzero(confidence >= min_confidence)
+        a_support, c_support = a_support[keep], c_support[keep]
+        support, confidence = support[keep], confidence[keep]
+        lift = confidence / c_support
+        leverage = support - a_support * c_support
+        conviction = np.where(
+            confidence >= 1.0, np.inf, (1.0 - c_support) / (1.0 - confidence)
+        )
+
+    ids = items.ids
+    return pd.DataFrame(
+        {
+            "antecedents": [frozenset(ids[i] for i in antecedents[r]) for r in keep],
+            "consequents": [frozenset(ids[i] for i in consequents[r]) for r in keep],
+            "antecedent support": a_support,
+            "consequent support": c_support,
+            "support": support,
+            "confidence": confidence,
+            "lift": lift,
+            "leverage": leverage,
+            "conviction": conviction,
+        },
+        columns=RULE_COLUMNS,
+    )
+
+
+def mine_sparse_rules(transactions, min_support=0.05, min_confidence=0.2, max_len=None):
+    """Integer-coded replacement for TransactionEncoder + fpgrowth + association_rules."""
+    items, baskets = encode_baskets(transactions)
+    levels = frequent_itemsets(baskets, min_support, max_len=max_len)
+    return association_rules_from_itemsets(
+        levels, items, baskets.shape[0], min_confidence
+    )
+
+
+def mine_basket_rules(baskets, min_support=0.05, min_confidence=0.2, max_len=None):
+    """mine_sparse_rules over a loader.Baskets (single-item orders dropped)."""
+    levels = frequent_itemsets(
+        baskets.matrix,
+        min_support,
+        max_len=max_len,
+        n_transactions=baskets.n_transactions,
+    )
+    levels = with_item_counts(
+        levels, baskets.item_counts, baskets.n_transactions, min_support
+    )
+    return association_rules_from_itemsets(
+        levels, baskets.items, baskets.n_transactions, min_confidence
+    )
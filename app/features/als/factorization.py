@@ -0,0 +1,54 @@
+import numpy as np
+from scipy import sparse
+
+
+def train_als(matrix, factors=64, iterations=15, regularization=0.01, alpha=40.0, seed=0):
+    """
+    Alternate exact least-squares solves for user and item factors with
+    confidence 1 + alpha * quantity. Returns float32 (user, item) factors.
+    """
+    confidence = sparse.csr_matrix(matrix, dtype=np.float64) * alpha
+    confidence_t = confidence.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(0, 0.01, (confidence.shape[0], factors))
+    item_factors = rng.normal(0, 0.01, (confidence.shape[1], factors))
+
+    for _ in range(iterations):
+        user_factors = _least_squares(confidence, item_factors, regularization)
+        item_factors = _least_squares(confidence_t, user_factors, regularization)
+
+    return user_factors.astype(np.float32), item_factors.astype(np.float32)
+
+
+def _least_squares(confidence, fixed, regularization):
+    """
+    Solve (YᵀY + Yᵀ(Cu - I)Y + λI) x_u = YᵀCu p_u for every row u. Only the
+    rows' non-zero entries contribute beyond the shared YᵀY term.
+    """
+    n_factors = fixed.shape[1]
+    base = fixed.T @ fixed + regularization * np.eye(n_factors)
+    solved = np.zeros((confidence.shape[0], n_factors))
+
+    for u in range(confidence.shape[0]):
+        start, end = confidence.indptr[u], confidence.indptr[u + 1]
+        if start == end:
+            continue
+        y = fixed[confidence.indices[start:end]]
+        conf = confidence.data[start:end]
+        a = base + (y.T * conf) @ y
+        b = y.T @ (1.0 + conf)
+        solved[u] = np.linalg.solve(a, b)
+    return solved
+
+
+def top_items(user_vector, item_factors, exclude, top_n=5):
+    """Item columns with the highest user · item score, skipping exclude."""
+    scores = item_factors @ user_vector
+    scores[exclude] = -np.inf
+
+    top_n = min(top_n, len(scores) - len(exclude))
+    if top_n <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, top_n - 1)[:top_n]
+    return top[np.argsort(-scores[top])]
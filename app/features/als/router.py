@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Request
+
+from app.shares.jobs import job_accepted
+
+router = APIRouter(prefix="/recommend/als", tags=["ALS Recommender"])
+
+
+async def _submit_training(request, lazy_model, factors=None, iterations=None):
+    async def run(job):
+        recommender_als = await lazy_model.get()
+        await recommender_als.train(factors=factors, iterations=iterations)
+
+    return await request.app.state.jobs.submit(
+        "als_train", run, factors=factors, iterations=iterations
+    )
+
+
+@router.post("/")
+async def train_als_factors(
+    request: Request, factors: int | None = None, iterations: int | None = None
+):
+    try:
+        lazy_model = request.app.state.models.als
+        if lazy_model is None:
+            return {"error": "ALSRecommender model not initialized"}
+
+        job, created = await _submit_training(
+            request, lazy_model, factors=factors, iterations=iterations
+        )
+        return job_accepted(job, created)
+
+    except Exception as e:
+        return {
+            "error": "ALSRecommender not available, database not ready",
+            "details": str(e),
+        }
+
+
+@router.get("/users/{user_id}")
+async def recommend_als(request: Request, user_id: str, top_n: int = 5):
+    try:
+        lazy_model = request.app.state.models.als
+        if lazy_model is None:
+            return {"error": "ALSRecommender model not initialized"}
+
+        recommender_als = await lazy_model.get()
+        await recommender_als.sync_factors()
+        if not recommender_als.trained:
+            # No factors saved yet: start training and answer with no picks.
+            job, _ = await _submit_training(request, lazy_model)
+            return {"user_id": user_id, "recommendations": [], "training_job_id": job.id}
+
+        recs = await recommender_als.recommend(user_id, top_n=top_n)
+
+        return {"user_id": user_id, "recommendations": recs}
+
+    except Exception as e:
+        return {
+            "error": "ALSRecommender not available, database not ready",
+            "details": str(e),
+        }
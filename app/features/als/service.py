@@ -0,0 +1,158 @@
+import asyncio
+import os
+import tempfile
+
+import numpy as np
+
+from app.configs.settings import settings
+from app.features.als.factorization import top_items, train_als
+from app.shares.id_index import IdIndex
+from app.shares.interactions import InteractionStore
+
+
+class ALSRecommender:
+    """
+    Implicit-feedback matrix factorization (Hu, Koren & Volinsky) over the
+    user × product purchased-quantity matrix.
+
+    Factors are trained offline and kept as float32 arrays; serving a user
+    is one dot product against the item factors plus top-k, skipping
+    products the user has bought according to the shared InteractionStore
+    snapshot (so purchases made after training are still excluded).
+
+    Every worker serves factors.npz: whichever process trains writes it,
+    and the others reload it once its mtime changes.
+    """
+
+    def __init__(self, pool, interactions=None):
+        self.pool = pool
+        self.store = interactions or InteractionStore(pool)
+        self.users = None
+        self.products = None
+        self.user_factors = None
+        self.item_factors = None
+        self.factors_mtime = None
+        self._reload = None
+
+    @classmethod
+    async def from_pretrained(cls, pool=None, interactions=None):
+        if pool is None:
+            raise ValueError("Database pool must be provided for ALSRecommender.")
+        instance = cls(pool, interactions=interactions)
+
+        # Without saved factors the instance stays untrained: training is a
+        # background job (POST /recommend/als/), never part of loading.
+        await instance.sync_factors()
+        return instance
+
+    @property
+    def trained(self):
+        return self.user_factors is not None
+
+    @staticmethod
+    def factors_path():
+        return os.path.join(settings.model_dir, "als", "factors.npz")
+
+    async def sync_factors(self):
+        """
+        Load factors.npz when it is newer than the factors being served. An
+        untrained instance waits for the load; a trained one keeps serving
+        while the new factors are read in the background.
+        """
+        mtime = _mtime(self.factors_path())
+        if mtime is None or mtime == self.factors_mtime:
+            return
+        if not self.trained:
+            await asyncio.to_thread(self.load)
+        elif self._reload is None:
+            self._reload = asyncio.create_task(asyncio.to_thread(self.load))
+            self._reload.add_done_callback(self._reloaded)
+
+    def _reloaded(self, task):
+        self._reload = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Reloading ALS factors failed: {task.exception()!r}")
+
+    async def train(self, factors=None, iterations=None):
+        interactions = await self.store.refresh()
+
+        user_factors, item_factors = await asyncio.to_thread(
+            train_als,
+            interactions.matrix,
+            factors=factors or settings.als_factors,
+            iterations=iterations or settings.als_iterations,
+            regularization=settings.als_regularization,
+            alpha=settings.als_alpha,
+        )
+        self.users, self.products = interactions.users, interactions.products
+        self.user_factors, self.item_factors = user_factors, item_factors
+        await asyncio.to_thread(self.save)
+
+    def save(self):
+        """Write the factors atomically, so a reader never loads a partial file."""
+        path = self.factors_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp name: concurrent writers must not share one file.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix="factors.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    user_factors=self.user_factors,
+                    item_factors=self.item_factors,
+                    user_ids=np.array(self.users.ids),
+                    product_ids=np.array(self.products.ids),
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.factors_mtime = _mtime(path)
+
+    def load(self):
+        path = self.factors_path()
+        # Stat before reading: a file replaced meanwhile is picked up next time.
+        mtime = _mtime(path)
+        with np.load(path) as data:
+            user_factors = data["user_factors"]
+            item_factors = data["item_factors"]
+            users = IdIndex(data["user_ids"].tolist())
+            products = IdIndex(data["product_ids"].tolist())
+        self.users, self.products, self.user_factors, self.item_factors = (
+            users,
+            products,
+            user_factors,
+            item_factors,
+        )
+        self.factors_mtime = mtime
+
+    async def recommend(self, user_id, top_n=5):
+        await self.sync_factors()
+        users, products = self.users, self.products
+        user_factors, item_factors = self.user_factors, self.item_factors
+        if user_factors is None:
+            return []
+        row = users.get(user_id)
+        if row is None:
+            return []
+
+        interactions = await self.store.get()
+        bought = np.empty(0, dtype=np.int64)
+        purchase_row = interactions.users.get(user_id)
+        if purchase_row is not None:
+            matrix = interactions.matrix
+            cols = matrix.indices[matrix.indptr[purchase_row] : matrix.indptr[purchase_row + 1]]
+            bought = products.get_many(interactions.products[c] for c in cols)
+            bought = bought[bought >= 0]
+
+        top = top_items(user_factors[row], item_factors, bought, top_n)
+        return [{"product_id": products[c]} for c in top]
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
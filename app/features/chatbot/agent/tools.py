@@ -3,7 +3,9 @@ from typing import Optional, Dict, Any, List
 import httpx
 from langchain.tools import tool
 
+from app.configs.settings import settings
 from app.features.chatbot.integrations.backend_client import BackendClient
+from app.features.search.service import semantic_search
 
 def _safe_json(response: httpx.Response) -> Dict[str, Any]:
     try:
@@ -45,6 +47,39 @@ def _filter_products(
         filtered.append(product)
     return filtered
 
+async def _semantic_products(
+    keyword: str,
+    min_price: Optional[float],
+    max_price: Optional[float],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Products from the in-process semantic index scoring at least
+    chatbot_semantic_min_score, described only with what the index holds
+    (no backend call per hit); None when the search fails (the backend name
+    search is used then).
+    """
+    try:
+        results = await semantic_search.search(
+            keyword,
+            top_n=settings.chatbot_semantic_top_n,
+            min_price=min_price,
+            max_price=max_price,
+        )
+    except Exception as exc:
+        print(f"[browse_catalog] Semantic search failed, using backend search: {exc!r}")
+        return None
+    return [
+        {
+            "id": result["product_id"],
+            "name": result["name"],
+            "brand": result["brand"],
+            "minPrice": result["min_price"],
+            "score": result["score"],
+        }
+        for result in results
+        if result["score"] >= settings.chatbot_semantic_min_score
+    ]
+
 @tool
 async def browse_catalog(
     search_keyword: str,
@@ -67,9 +102,10 @@ async def browse_catalog(
         - id: product_id
         - name: product name
         - minPrice: lowest variant price
-        - rating: average rating
-        - reviewCount: number of reviews
-        - inStock: availability
+        - rating: average rating (backend search only)
+        - reviewCount: number of reviews (backend search only)
+        - inStock: availability (backend search only)
+        - brand, score: semantic search only (see get_product_info for details)
     
     Example:
         Input: search_keyword="laptop", max_price=15000000
@@ -79,6 +115,16 @@ async def browse_catalog(
     if not keyword:
         return {"error": "Vui lòng cung cấp từ khóa tìm kiếm."}
 
+    products = None
+    if settings.chatbot_catalog_search == "semantic":
+        products = await _semantic_products(keyword, min_price, max_price)
+    if products is not None:
+        return {
+            "keyword": keyword,
+            "filters": {"min_price": min_price, "max_price": max_price},
+            "products": products,
+        }
+
     client = BackendClient()
     try:
         payload = await client.search_products_by_name(keyword)
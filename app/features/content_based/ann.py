@@ -0,0 +1,168 @@
+import faiss
+import numpy as np
+
+INDEX_KINDS = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+SCALAR_QUANTIZERS = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+DEFAULT_OPTIONS = dict(
+    kind="flat", hnsw_m=32, nlist=0, pq_m=48, pq_nbits=8, embedding_dtype="float32"
+)
+
+
+def index_options(
+    kind="flat", hnsw_m=32, nlist=0, pq_m=48, pq_nbits=8, embedding_dtype="float32"
+):
+    """
+    The build options of a content index. Search-time knobs (efSearch,
+    nprobe) are not part of them: changing those never needs a rebuild.
+    """
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown content index type: {kind}")
+    if embedding_dtype != "float32" and embedding_dtype not in SCALAR_QUANTIZERS:
+        raise ValueError(f"Unknown content embedding dtype: {embedding_dtype}")
+    if kind == "ivf_pq" and embedding_dtype != "float32":
+        # PQ codes are too lossy to be the only copy of the vectors.
+        raise ValueError("ivf_pq keeps float32 embeddings; use flat, hnsw or ivf_flat")
+    return dict(
+        kind=kind,
+        hnsw_m=hnsw_m,
+        nlist=nlist,
+        pq_m=pq_m,
+        pq_nbits=pq_nbits,
+        embedding_dtype=embedding_dtype,
+    )
+
+
+def is_trained(options):
+    return options["kind"] in ("ivf_flat", "ivf_pq")
+
+
+def supports_removal(options):
+    # HNSW graphs cannot drop vectors; Flat and IVF lists can.
+    return options["kind"] != "hnsw"
+
+
+def keeps_embeddings(options):
+    """
+    Whether artifacts keep a float32 embedding matrix next to the index.
+    With a float16 / int8 embedding_dtype the index codes are the only
+    copy and vectors are reconstructed from them.
+    """
+    return options["embedding_dtype"] == "float32"
+
+
+def build_index(
+    embeddings,
+    keys,
+    kind="flat",
+    hnsw_m=32,
+    nlist=0,
+    pq_m=48,
+    pq_nbits=8,
+    embedding_dtype="float32",
+):
+    """
+    Inner-product index over L2-normalized embeddings, searchable by keys.
+
+    - flat: exact brute-force scan (IndexFlatIP);
+    - hnsw: graph search, no training, tuned with efSearch;
+    - ivf_flat / ivf_pq: nlist k-means lists (0 = 4 * sqrt(products)),
+      trained on a sample of the embeddings and tuned with nprobe; ivf_pq
+      stores pq_m codes of pq_nbits bits per product instead of the
+      float32 vector.
+
+    IVF indexes store the keys themselves; flat and HNSW are wrapped in an
+    IndexIDMap2. A catalog too small to train the requested IVF index is
+    indexed with flat until it grows.
+
+    A float16 / int8 embedding_dtype stores flat, HNSW and IVF-Flat vectors
+    through a ScalarQuantizer instead of as float32, and IVF then keeps a
+    direct map so vectors can be reconstructed by key.
+    """
+    n_rows, dim = embeddings.shape
+    nlist = nlist or int(4 * np.sqrt(n_rows))
+    if kind == "ivf_pq" and dim % pq_m:
+        raise ValueError(f"pq_m={pq_m} must divide the embedding dim {dim}")
+    min_rows = {"ivf_flat": nlist, "ivf_pq": max(nlist, 2**pq_nbits)}.get(kind, 0)
+    if n_rows < max(min_rows, 1):
+        kind = "flat"
+
+    metric = faiss.METRIC_INNER_PRODUCT
+    qtype = SCALAR_QUANTIZERS.get(embedding_dtype)
+    if kind == "flat" and qtype is None:
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    elif kind == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexScalarQuantizer(dim, qtype, metric))
+    elif kind == "hnsw" and qtype is None:
+        index = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dim, hnsw_m, metric))
+    elif kind == "hnsw":
+        index = faiss.IndexIDMap2(faiss.IndexHNSWSQ(dim, qtype, hnsw_m, metric))
+    elif kind in ("ivf_flat", "ivf_pq"):
+        quantizer = faiss.IndexFlatIP(dim)
+        if kind == "ivf_pq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits, metric)
+        elif qtype is None:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, metric)
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    else:
+        raise ValueError(f"Unknown content index type: {kind}")
+
+    if not index.is_trained and n_rows:
+        sample = np.random.default_rng(0).choice(
+            n_rows, size=min(n_rows, 256 * max(nlist, 2**pq_nbits)), replace=False
+        )
+        index.train(np.ascontiguousarray(embeddings[np.sort(sample)], dtype=np.float32))
+
+    for start in range(0, n_rows, 20000):
+        stop = min(start + 20000, n_rows)
+        index.add_with_ids(
+            np.ascontiguousarray(embeddings[start:stop], dtype=np.float32),
+            np.asarray(keys[start:stop], dtype=np.int64),
+        )
+    return index
+
+
+def set_search_params(index, ef_search=64, nprobe=16):
+    """Apply the search-time knobs that fit the index type; others are ignored."""
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    return index
+
+
+def filtered_search_params(index, keys):
+    """
+    SearchParameters that restrict a search of index to keys. This is a
+    prefilter: other products are skipped during the scan rather than
+    dropped from its top k. The index's own efSearch / nprobe are kept.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    bits = np.zeros(int(keys.max()) + 1 if len(keys) else 0, dtype=bool)
+    bits[keys] = True
+    bitmap = np.packbits(bits, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+
+    inner = _inner(index)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    elif isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    # The selector reads the bitmap through a raw pointer.
+    params.referenced_objects = [selector, bitmap]
+    return params
+
+
+def _inner(index):
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.downcast_index(index.index)
+    return index
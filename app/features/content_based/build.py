@@ -0,0 +1,64 @@
+"""
+Build the content index offline, outside the API process, so a cold node
+opens ready artifacts (settings.model_dir/content/<model>/) instead of
+encoding the whole catalog before its first content recommendation. Run
+again later, it only encodes what changed, like a refresh.
+
+    python -m app.features.content_based.build --workers 4
+    python -m app.features.content_based.build --products catalog.csv --model-dir /models
+
+Without --products the APPROVED catalog is read from the database; a CSV
+needs product_id, name, brand and description columns (min_price optional).
+"""
+
+import argparse
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.configs.database import close_db_pool, init_db_pool
+from app.configs.settings import settings
+from app.features.content_based.service import ContentRecommender
+
+
+async def build(model_name, products_csv=None):
+    if products_csv is not None:
+        products = pd.read_csv(products_csv, dtype={"product_id": str})
+        if "min_price" not in products:
+            products["min_price"] = np.nan
+        return await ContentRecommender(model_name=model_name).refresh(products)
+
+    pool = await init_db_pool()
+    try:
+        return await ContentRecommender(model_name=model_name, pool=pool).refresh()
+    finally:
+        await close_db_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--workers", type=int, default=settings.content_encode_workers)
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.content_encode_batch_size
+    )
+    parser.add_argument("--index-type", default=settings.content_index_type)
+    parser.add_argument("--model-dir", default=settings.model_dir)
+    parser.add_argument("--products", help="CSV export of the catalog instead of the database")
+    args = parser.parse_args()
+
+    settings.content_encode_workers = args.workers
+    settings.content_encode_batch_size = args.batch_size
+    settings.content_index_type = args.index_type
+    settings.model_dir = args.model_dir
+
+    stats = asyncio.run(build(args.model, args.products))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Below this many texts a pool's start-up (one model load per worker) costs
+# more than it saves; refreshes that encode a few edits stay in-process.
+PARALLEL_MIN_TEXTS = 5000
+
+_model = None
+
+
+def length_sorted_chunks(texts, chunk_size):
+    """
+    Positions of texts split into chunks of chunk_size, longest texts first,
+    so every batch inside a chunk pads to a similar length. encode() only
+    sorts within one call, which a pool splits into arbitrary chunks.
+    """
+    order = np.argsort([-len(text) for text in texts], kind="stable")
+    return [order[start : start + chunk_size] for start in range(0, len(order), chunk_size)]
+
+
+def _init_worker(model_name, threads):
+    global _model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Workers split the cores instead of each spawning one thread per core.
+    torch.set_num_threads(threads)
+    _model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_chunk(texts, batch_size):
+    return _model.encode(
+        texts, batch_size=batch_size, convert_to_tensor=False, show_progress_bar=False
+    ).astype(np.float32)
+
+
+def encode_parallel(
+    model_name, texts, workers, batch_size=64, chunk_size=1024, progress=None
+):
+    """
+    float32 embeddings of texts (in input order, not normalized) encoded
+    by a pool of `workers` processes, each with its own copy of the model
+    and cpu_count // workers torch threads. progress(done, total) is called
+    as chunks finish.
+    """
+    chunks = length_sorted_chunks(texts, chunk_size)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    embeddings = None
+    done = 0
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model_name, threads),
+    ) as pool:
+        futures = {
+            pool.submit(_encode_chunk, [texts[i] for i in chunk], batch_size): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            chunk, vectors = futures[future], future.result()
+            if embeddings is None:
+                embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            embeddings[chunk] = vectors
+            done += len(chunk)
+            if progress is not None:
+                progress(done, len(texts))
+    return embeddings
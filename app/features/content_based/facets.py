@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from app.shares.id_index import IdIndex
+
+
+class ProductFacets:
+    """
+    Name, brand and lowest variant price of each content artifact row, to
+    filter and describe semantic search results. Brands match ignoring case
+    and surrounding spaces; a product without variants has a NaN price and
+    never passes a price filter.
+    """
+
+    def __init__(self, names, brand_names, brands: IdIndex, brand_codes, prices):
+        self.names = names
+        self.brand_names = brand_names
+        self.brands = brands
+        self.brand_codes = brand_codes
+        self.prices = prices
+
+    @classmethod
+    def from_products(cls, products, product_ids):
+        """Facets of the products DataFrame laid out in artifact row order."""
+        rows = products.set_index("product_id").reindex(product_ids)
+        brand_names = rows["brand"].fillna("").tolist()
+        brands = IdIndex()
+        brand_codes = brands.add_many(_brand_key(brand) for brand in brand_names)
+        prices = pd.to_numeric(rows["min_price"], errors="coerce").to_numpy(np.float64)
+        return cls(
+            rows["name"].fillna("").tolist(),
+            brand_names,
+            brands,
+            brand_codes.astype(np.int32),
+            prices,
+        )
+
+    def rows(self, brand=None, min_price=None, max_price=None):
+        """Rows passing the filters, or None when no filter is set."""
+        if brand is None and min_price is None and max_price is None:
+            return None
+
+        keep = np.ones(len(self.prices), dtype=bool)
+        if brand is not None:
+            code = self.brands.get(_brand_key(brand))
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            keep &= self.brand_codes == code
+        if min_price is not None:
+            keep &= self.prices >= min_price
+        if max_price is not None:
+            keep &= self.prices <= max_price
+        return np.flatnonzero(keep)
+
+    def describe(self, row):
+        price = self.prices[row]
+        return {
+            "name": self.names[row],
+            "brand": self.brand_names[row],
+            "min_price": None if np.isnan(price) else float(price),
+        }
+
+
+def _brand_key(brand):
+    return brand.strip().lower()
@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.features.content_based.ann import filtered_search_params
+
+# A filter leaving at most this many products is scored exactly instead of
+# through a filtered index search (cheaper, and exact for HNSW / IVF).
+EXACT_SEARCH_ROWS = 20000
+
+
+def top_neighbours(artifacts, rows, top_n):
+    """
+    (rows, neighbour rows) of the top_n nearest products of each row, one
+    FAISS search for the whole block. Self matches and empty results are
+    masked out together, so each row keeps at most top_n neighbours.
+    """
+    queries = artifacts.vectors(rows)
+    _, keys = artifacts.index.search(queries, top_n + 1)
+    neighbours = artifacts.rows_for_keys(keys)
+
+    valid = (neighbours >= 0) & (neighbours != rows[:, None])
+    keep = valid & (np.cumsum(valid, axis=1) <= top_n)
+    return np.broadcast_to(rows[:, None], neighbours.shape)[keep], neighbours[keep]
+
+
+def search_rows(artifacts, query, top_n, allowed=None):
+    """
+    (scores, rows) of the top_n products closest to one L2-normalized
+    query vector, best first, searching only the allowed rows when given.
+    """
+    query = np.ascontiguousarray(query, dtype=np.float32).reshape(1, -1)
+    if allowed is None:
+        scores, keys = artifacts.index.search(query, top_n)
+    elif len(allowed) <= EXACT_SEARCH_ROWS:
+        similarities = artifacts.vectors(allowed) @ query[0]
+        top_n = min(top_n, len(allowed))
+        best = np.argpartition(-similarities, top_n - 1)[:top_n] if top_n else allowed[:0]
+        best = best[np.argsort(-similarities[best], kind="stable")]
+        return similarities[best], allowed[best]
+    else:
+        params = filtered_search_params(artifacts.index, artifacts.keys[allowed])
+        scores, keys = artifacts.index.search(query, top_n, params=params)
+
+    rows = artifacts.rows_for_keys(keys[0])
+    found = rows >= 0
+    return scores[0][found], rows[found]
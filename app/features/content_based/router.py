@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Request
 
+from app.shares.jobs import job_accepted
+
 router = APIRouter(prefix="/recommend/content", tags=["Content-Based Recommendation"])
 
 
@@ -20,20 +22,43 @@ async def recommend_content(request: Request, product_id: str, top_n: int = 5):
         }
 
 
-@router.post("/")
-async def update_similar_products(request: Request, top_n: int = 5):
+@router.post("/refresh")
+async def refresh_content_index(request: Request):
     try:
         lazy_model = getattr(request.app.state.models, "content_based", None)
         if lazy_model is None:
             return {"error": "ContentRecommender not initialized"}
 
-        recommender_content = await lazy_model.get()
+        async def run(job):
+            recommender_content = await lazy_model.get()
+            return await recommender_content.refresh()
 
-        await recommender_content.update_similar_products_in_db(top_n=top_n)
+        job, created = await request.app.state.jobs.submit("content_refresh", run)
+        return job_accepted(job, created)
+    except Exception as e:
         return {
-            "status": "success",
-            "message": "All product recommendations updated in DB.",
+            "error": "ContentRecommender not available, database not ready",
+            "details": str(e),
         }
+
+
+@router.post("/")
+async def update_similar_products(request: Request, top_n: int = 5):
+    try:
+        lazy_model = getattr(request.app.state.models, "content_based", None)
+        if lazy_model is None:
+            return {"error": "ContentRecommender not initialized"}
+
+        async def run(job):
+            recommender_content = await lazy_model.get()
+            await recommender_content.update_similar_products_in_db(
+                top_n=top_n, progress=job.report
+            )
+
+        job, created = await request.app.state.jobs.submit(
+            "content_similarities", run, top_n=top_n
+        )
+        return job_accepted(job, created)
     except Exception as e:
         return {
             "error": "ContentRecommender not available, database not ready",
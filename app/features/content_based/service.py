@@ -1,18 +1,69 @@
+import asyncio
+import os
+import time
+
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 import numpy as np
 
-import faiss
+from app.configs.settings import settings
+from app.features.content_based.ann import index_options, set_search_params
+from app.features.content_based.encoding import PARALLEL_MIN_TEXTS, encode_parallel
+from app.features.content_based.facets import ProductFacets
+from app.features.content_based.knn import search_rows, top_neighbours
+from app.features.content_based.store import (
+    ContentArtifacts,
+    ContentIndexStore,
+    content_hashes,
+    product_texts,
+)
+from app.shares.id_index import IdIndex
+from app.shares.jobs import no_progress
+from app.shares.publish import publish_table
 
 
 class ContentRecommender:
     def __init__(self, model_name: str = None, top_n: int = 5, pool=None):
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self._model = None
         self.products = None
         self.pool = pool
-        self.embeddings = None
-        self.index = None
+        self.artifacts = None
+        self.facets = None
         self.top_n = top_n
+        self.index_options = index_options(
+            kind=settings.content_index_type,
+            hnsw_m=settings.content_hnsw_m,
+            nlist=settings.content_ivf_nlist,
+            pq_m=settings.content_pq_m,
+            pq_nbits=settings.content_pq_nbits,
+            embedding_dtype=settings.content_embedding_dtype,
+        )
+        self.store = ContentIndexStore(
+            os.path.join(settings.model_dir, "content"), model_name
+        )
+        self._refresh_lock = asyncio.Lock()
+        self._store_checked_at = time.monotonic()
+        self._revalidation = None
+
+    @property
+    def model(self):
+        """SentenceTransformer, loaded on first use (a current store needs none)."""
+        if self._model is None:
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    async def load_model(self):
+        """Load the SentenceTransformer off the event loop, ahead of the first query."""
+        await asyncio.to_thread(lambda: self.model)
+
+    @property
+    def embeddings(self):
+        return self.artifacts.embeddings
+
+    @property
+    def index(self):
+        return self.artifacts.index
 
     @classmethod
     async def from_pretrained(cls, model_name="all-MiniLM-L6-v2", pool=None):
@@ -23,38 +74,158 @@ class ContentRecommender:
             raise ValueError("model_name must be provided")
         self = cls(model_name=model_name, pool=pool)
 
-        self.products = await self.load_products()
+        await self.refresh()
+        return self
 
-        texts = (
-            self.products["name"].fillna("")
-            + " "
-            + self.products["brand"].fillna("")
-            + " "
-            + self.products["description"].fillna("")
-        )
+    async def refresh(self, products=None):
+        """
+        Re-read the approved catalog (or take the given products DataFrame):
+        encode only new or edited products, remove delisted ones from the
+        index and publish a new version. Search facets (names, brands,
+        prices) are re-read every time.
+        """
+        async with self._refresh_lock:
+            start = time.perf_counter()
+            if products is None:
+                products = await self.load_products()
+            artifacts, encoded, removed, encode_seconds = await asyncio.to_thread(
+                self._sync_artifacts, products
+            )
+            facets = ProductFacets.from_products(products, artifacts.product_ids)
+            del products  # only needed for encoding and facets
+            self._set_artifacts(artifacts, facets)
+        return {
+            "products": len(artifacts),
+            "encoded": encoded,
+            "removed": removed,
+            "encode_seconds": encode_seconds,
+            "texts_per_second": encoded / encode_seconds if encode_seconds else None,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def revalidate(self):
+        """
+        Pick up versions published by other workers: at most every
+        content_store_check_interval seconds, compare the store's CURRENT with
+        the version being served and, when it moved, refresh in the
+        background while requests keep the current artifacts.
+        """
+        now = time.monotonic()
+        if (
+            self._revalidation is not None
+            or now - self._store_checked_at < settings.content_store_check_interval
+        ):
+            return
+        self._store_checked_at = now
+        if self._store_changed():
+            self._revalidation = asyncio.create_task(self.refresh())
+            self._revalidation.add_done_callback(self._revalidated)
+
+    def _revalidated(self, task):
+        self._revalidation = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background content index refresh failed: {task.exception()!r}")
 
-        self.embeddings = self.model.encode(
-            texts.tolist(),
-            convert_to_tensor=False,
-            batch_size=64,
-            show_progress_bar=True,
-        ).astype("float32")
+    def _store_changed(self):
+        served = self.artifacts.path if self.artifacts is not None else None
+        return self.store.current_path() != served
 
-        self.embeddings = self.embeddings / np.linalg.norm(
-            self.embeddings, axis=1, keepdims=True
+    def _set_artifacts(self, artifacts, facets):
+        set_search_params(
+            artifacts.index,
+            ef_search=settings.content_hnsw_ef_search,
+            nprobe=settings.content_ivf_nprobe,
+        )
+        # Serving only needs product id <-> artifact row, plus search facets.
+        self.products, self.artifacts, self.facets = (
+            IdIndex(artifacts.product_ids.tolist()),
+            artifacts,
+            facets,
         )
 
-        dim = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dim)
-        self.index.add(self.embeddings)
+    def _sync_artifacts(self, products):
+        """
+        (artifacts, encoded, removed, encode seconds) for the products. The
+        latest stored version is reused as is when nothing changed; otherwise
+        products whose content hash is new are encoded and added, products
+        that were delisted or edited are removed, and a new version is saved.
+        The index is rebuilt instead when content_index_type or its build
+        options changed (see ContentArtifacts.needs_rebuild). Runs under the
+        store's host-wide lock.
+        """
+        product_ids = products["product_id"].to_numpy(dtype=str)
+        texts = product_texts(products)
+        hashes = content_hashes(texts)
 
-        return self
+        with self.store.lock():
+            # Read the stored version only once the lock is held: another
+            # worker may have published the same catalog while we waited.
+            current = self.store.current() or self.artifacts
+            if current is None:
+                reuse = np.full(len(product_ids), -1)
+                drop = np.empty(0, dtype=np.int64)
+            else:
+                reuse = current.reusable_rows(product_ids, hashes)
+                drop = np.setdiff1d(np.arange(len(current)), reuse[reuse >= 0])
+            encode = np.flatnonzero(reuse < 0)
+            if (
+                current is not None
+                and not len(encode)
+                and not len(drop)
+                and not current.needs_rebuild(self.index_options)
+            ):
+                return current, 0, 0, 0.0
+
+            print(
+                f"Content index: encoding {len(encode)} of {len(product_ids)} products, "
+                f"removing {len(drop)}."
+            )
+            encode_start = time.perf_counter()
+            if len(encode):
+                embeddings = self.encode([texts[i] for i in encode])
+            else:
+                embeddings = np.empty((0, current.dim), dtype=np.float32)
+            encode_seconds = time.perf_counter() - encode_start
+            if len(encode):
+                print(
+                    f"Content index: encoded {len(encode)} texts in {encode_seconds:.1f}s "
+                    f"({len(encode) / encode_seconds:.0f} texts/sec)."
+                )
+            base = current or ContentArtifacts.empty(embeddings.shape[1])
+            artifacts = base.updated(
+                drop, product_ids[encode], hashes[encode], embeddings, self.index_options
+            )
+            return self.store.save(artifacts), len(encode), len(drop), encode_seconds
+
+    def encode(self, texts, show_progress_bar=True):
+        """
+        L2-normalized float32 embeddings of texts. With content_encode_workers
+        > 1, large batches (the initial build) are encoded by a process pool
+        in length-sorted chunks; the in-process model is not loaded for them.
+        """
+        workers = settings.content_encode_workers
+        batch_size = settings.content_encode_batch_size
+        if workers > 1 and len(texts) >= PARALLEL_MIN_TEXTS:
+            embeddings = encode_parallel(
+                self.model_name, texts, workers, batch_size=batch_size
+            )
+        else:
+            embeddings = self.model.encode(
+                texts,
+                convert_to_tensor=False,
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+            ).astype("float32")
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
 
     async def load_products(self):
         """Load toàn bộ product từ DB"""
         async with self.pool.acquire() as conn:
             rows = await conn.fetch(
-                "SELECT product_id, name, brand, description FROM products WHERE status = 'APPROVED'"
+                "SELECT p.product_id, p.name, p.brand, p.description, "
+                "(SELECT MIN(pv.price)::float8 FROM product_variants pv "
+                "WHERE pv.product_id = p.product_id) AS min_price "
+                "FROM products p WHERE p.status = 'APPROVED' ORDER BY p.product_id"
             )
 
             df = pd.DataFrame([dict(r) for r in rows])
@@ -63,44 +234,66 @@ class ContentRecommender:
 
     def recommend(self, product_id, top_n=None):
         """get top_n similar products based on cosine similarity"""
-        if product_id not in self.products["product_id"].values:
+        self.revalidate()
+        products, artifacts = self.products, self.artifacts
+        row = products.get(product_id)
+        if row is None:
             return []
 
         if top_n is None:
             top_n = self.top_n
 
-        idx = self.products.index[self.products["product_id"] == product_id][0]
-        query_vec = self.embeddings[idx].reshape(1, -1)
-
-        _, indices = self.index.search(query_vec, top_n + 1)
+        _, neighbours = top_neighbours(artifacts, np.array([row]), top_n)
+        return [{"product_id": products[r]} for r in neighbours.tolist()]
 
-        rec_indices = [i for i in indices[0] if i != idx][:top_n]
+    def search(self, query, top_n=10, brand=None, min_price=None, max_price=None):
+        """
+        Products whose name, brand and description are closest to the query
+        text, optionally only those of brand whose lowest variant price is
+        within [min_price, max_price]. The query is encoded once with the
+        catalog's model and the filters prefilter the index search.
+        """
+        products, artifacts, facets = self.products, self.artifacts, self.facets
+        allowed = facets.rows(brand, min_price, max_price)
+        if allowed is not None and not len(allowed):
+            return []
 
-        return self.products.iloc[rec_indices][["product_id"]].to_dict(orient="records")
+        query_vector = self.encode([query], show_progress_bar=False)[0]
+        scores, rows = search_rows(artifacts, query_vector, top_n, allowed)
+        return [
+            {"product_id": products[row], **facets.describe(row), "score": float(score)}
+            for score, row in zip(scores.tolist(), rows.tolist())
+        ]
 
-    async def update_similar_products_in_db(self, top_n=None):
+    async def update_similar_products_in_db(self, top_n=None, progress=no_progress):
         """Cập nhật bảng product_similarities"""
         if top_n is None:
             top_n = self.top_n
 
+        # Another worker may have published a newer catalog: write its pairs.
+        if await asyncio.to_thread(self._store_changed):
+            await self.refresh()
+        products, artifacts = self.products, self.artifacts
+        n_products = len(artifacts)
+        chunk_size = settings.content_knn_chunk_size
+
+        async def similarities():
+            # One FAISS search per chunk (spread over its OpenMP threads),
+            # streamed into COPY so only a chunk of pairs is alive at once.
+            for start in range(0, n_products, chunk_size):
+                progress(start / max(n_products, 1), "writing similarities")
+                rows = np.arange(start, min(start + chunk_size, n_products))
+                sources, targets = await asyncio.to_thread(
+                    top_neighbours, artifacts, rows, top_n
+                )
+                for source, target in zip(sources.tolist(), targets.tolist()):
+                    yield products[source], products[target]
+
         async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute("TRUNCATE TABLE product_similarities")
-
-                for _, row in self.products.iterrows():
-                    product_id = row["product_id"]
-                    recs = self.recommend(product_id, top_n=top_n)
-                    rec_ids = [r["product_id"] for r in recs]
-
-                    values = [
-                        (str(product_id), str(similar_id)) for similar_id in rec_ids
-                    ]
-                    if values:
-                        await conn.executemany(
-                            """
-                            INSERT INTO product_similarities (product_id, similar_product_id)
-                            VALUES ($1, $2)
-                            """,
-                            values,
-                        )
+            await publish_table(
+                conn,
+                "product_similarities",
+                ["product_id", "similar_product_id"],
+                similarities(),
+            )
         print("Updated all product similarities using FAISS successfully.")
@@ -0,0 +1,333 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+
+from app.features.content_based.ann import (
+    DEFAULT_OPTIONS,
+    build_index,
+    is_trained,
+    keeps_embeddings,
+    supports_removal,
+)
+
+FORMAT_VERSION = 2
+KEEP_VERSIONS = 2
+
+
+def product_texts(products):
+    """The text embedded for each product row: name, brand and description."""
+    return (
+        products["name"].fillna("")
+        + " "
+        + products["brand"].fillna("")
+        + " "
+        + products["description"].fillna("")
+    ).tolist()
+
+
+def content_hashes(texts):
+    """Per-product content hash; an embedding is reusable while it matches."""
+    return np.array(
+        [hashlib.sha1(text.encode("utf-8")).hexdigest() for text in texts], dtype="U40"
+    )
+
+
+class ContentArtifacts:
+    """
+    One version of the content index. Row i holds product_ids[i], its
+    content hash, its embedding and keys[i], the id it has in the FAISS
+    index. Keys are never reused and rows stay sorted by key, so a search
+    hit maps back to its row with a binary search.
+
+    options are the ann.index_options the index was built with and
+    trained_rows the catalog size at that build. embeddings is the float32
+    matrix, or None when the index codes are the only copy (a float16 /
+    int8 embedding_dtype); read vectors through vectors() either way.
+    """
+
+    def __init__(
+        self,
+        product_ids,
+        hashes,
+        keys,
+        embeddings,
+        index,
+        path=None,
+        options=None,
+        trained_rows=0,
+    ):
+        self.product_ids = product_ids
+        self.hashes = hashes
+        self.keys = keys
+        self.embeddings = embeddings
+        self.index = index
+        self.path = path
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.trained_rows = trained_rows
+
+    @classmethod
+    def empty(cls, dim, options=None):
+        return cls(
+            np.empty(0, dtype=str),
+            np.empty(0, dtype="U40"),
+            np.empty(0, dtype=np.int64),
+            np.empty((0, dim), dtype=np.float32),
+            faiss.IndexIDMap2(faiss.IndexFlatIP(dim)),
+            options=options,
+        )
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @property
+    def dim(self):
+        return self.index.d
+
+    def vectors(self, rows):
+        """float32 embeddings of rows, reconstructed from the index when it holds the only copy."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.embeddings is not None:
+            return np.ascontiguousarray(self.embeddings[rows], dtype=np.float32)
+        if not len(rows):
+            return np.empty((0, self.dim), dtype=np.float32)
+        return self.index.reconstruct_batch(self.keys[rows])
+
+    def rows_for_keys(self, keys):
+        """Rows of FAISS result keys; -1 stays -1 (no result)."""
+        keys = np.asarray(keys)
+        rows = np.searchsorted(self.keys, keys)
+        return np.where(keys >= 0, rows, -1)
+
+    def reusable_rows(self, product_ids, hashes):
+        """
+        For each (product_id, hash), the stored embedding row with the same
+        content, or -1 when the product is new or its text changed.
+        """
+        stored_keys = zip(self.product_ids.tolist(), self.hashes.tolist())
+        stored = {key: row for row, key in enumerate(stored_keys)}
+        return np.fromiter(
+            (stored.get(key, -1) for key in zip(product_ids.tolist(), hashes.tolist())),
+            dtype=np.int64,
+            count=len(product_ids),
+        )
+
+    def needs_rebuild(self, options, n_rows=None, removes=False):
+        """
+        Whether an index of n_rows products under options has to be built
+        from scratch rather than updated in place: the options changed, HNSW
+        has vectors to remove, or a trained (IVF) index has outgrown twice
+        the catalog it was trained on.
+        """
+        n_rows = len(self) if n_rows is None else n_rows
+        return (
+            options != self.options
+            or (removes and not supports_removal(options))
+            or (is_trained(options) and n_rows > 2 * max(self.trained_rows, 1))
+        )
+
+    def updated(self, drop_rows, product_ids, hashes, embeddings, options=None):
+        """
+        New artifacts with drop_rows removed from the index and the given
+        products added under fresh keys. Only the changed vectors go through
+        FAISS, unless needs_rebuild says the index must be rebuilt (and
+        retrained) from the kept embeddings; nothing is re-encoded.
+        """
+        options = self.options if options is None else options
+        first_key = int(self.keys[-1]) + 1 if len(self.keys) else 0
+        new_keys = np.arange(first_key, first_key + len(product_ids), dtype=np.int64)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        keep = np.ones(len(self), dtype=bool)
+        keep[drop_rows] = False
+        keys = np.concatenate([self.keys[keep], new_keys])
+
+        n_rows = len(keys)
+        rebuild = not len(self) or self.needs_rebuild(
+            options, n_rows, removes=len(drop_rows) > 0
+        )
+        if rebuild or keeps_embeddings(options):
+            all_embeddings = np.concatenate(
+                [self.vectors(np.flatnonzero(keep)), embeddings]
+            )
+        if rebuild:
+            index = build_index(all_embeddings, keys, **options)
+            trained_rows = n_rows
+        else:
+            index = _writable(self.index, self.path)
+            if len(drop_rows):
+                index.remove_ids(self.keys[drop_rows])
+            if len(product_ids):
+                index.add_with_ids(embeddings, new_keys)
+            trained_rows = self.trained_rows
+
+        return ContentArtifacts(
+            np.concatenate([self.product_ids[keep], np.asarray(product_ids, dtype=str)]),
+            np.concatenate([self.hashes[keep], np.asarray(hashes, dtype="U40")]),
+            keys,
+            all_embeddings if keeps_embeddings(options) else None,
+            index,
+            options=options,
+            trained_rows=trained_rows,
+        )
+
+
+class ContentIndexStore:
+    """
+    Versioned on-disk embeddings + FAISS index for one embedding model.
+
+    Layout under root/<model>/:
+        CURRENT                 name of the live version
+        v<timestamp>/           embeddings.npy (float32 only), index.faiss,
+                                products.npz, manifest.json
+
+    A version is written in full before CURRENT is atomically switched to
+    it. Opening memory-maps the embeddings read-only, so every worker
+    process on the host shares the same page cache instead of holding its
+    own copy. The index is mapped the same way only for the "flat"
+    content_index_type: IO_FLAG_MMAP_IFC maps flat codes, while HNSW and
+    IVF/PQ indexes are still read into each worker's heap.
+    """
+
+    def __init__(self, root, model_name):
+        self.model_name = model_name
+        self.root = os.path.join(root, re.sub(r"[^A-Za-z0-9._-]+", "_", model_name))
+
+    @contextmanager
+    def lock(self):
+        """
+        Exclusive flock on root/.lock, held by one process on the host at a
+        time. Writers hold it from reading current() to save() so two
+        workers don't encode the same catalog and race to publish.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def current_path(self):
+        """Directory of the version CURRENT names, or None before the first save."""
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return os.path.join(self.root, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def current(self):
+        """The live ContentArtifacts, or None if nothing usable is stored."""
+        try:
+            path = self.current_path()
+            return self.open(path) if path is not None else None
+        except (OSError, ValueError, RuntimeError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable content index in {self.root}: {e!r}")
+            return None
+
+    def open(self, path):
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if (
+            manifest.get("format") != FORMAT_VERSION
+            or manifest.get("model_name") != self.model_name
+        ):
+            raise ValueError(f"Stale content index manifest: {manifest}")
+
+        with np.load(os.path.join(path, "products.npz")) as data:
+            product_ids, hashes, keys = data["product_ids"], data["hashes"], data["keys"]
+        embeddings = None
+        if keeps_embeddings({**DEFAULT_OPTIONS, **manifest.get("index", {})}):
+            embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        index = faiss.read_index(os.path.join(path, "index.faiss"), _mmap_flags())
+        return ContentArtifacts(
+            product_ids,
+            hashes,
+            keys,
+            embeddings,
+            index,
+            path=path,
+            options=manifest.get("index"),
+            trained_rows=manifest.get("trained_rows", 0),
+        )
+
+    def save(self, artifacts):
+        """Write artifacts as a new version, make it current and return it opened from disk."""
+        product_ids, hashes, embeddings, index = (
+            artifacts.product_ids,
+            artifacts.hashes,
+            artifacts.embeddings,
+            artifacts.index,
+        )
+        version = f"v{time.time_ns()}"
+        path = os.path.join(self.root, version)
+        os.makedirs(path)
+
+        if embeddings is not None:
+            np.save(
+                os.path.join(path, "embeddings.npy"),
+                np.asarray(embeddings, dtype=np.float32),
+            )
+        faiss.write_index(index, os.path.join(path, "index.faiss"))
+        np.savez(
+            os.path.join(path, "products.npz"),
+            product_ids=np.asarray(product_ids, dtype=str),
+            hashes=np.asarray(hashes, dtype="U40"),
+            keys=np.asarray(artifacts.keys, dtype=np.int64),
+        )
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(
+                {
+                    "format": FORMAT_VERSION,
+                    "model_name": self.model_name,
+                    "products": len(product_ids),
+                    "dim": int(index.d),
+                    "index_type": type(index).__name__,
+                    "index": artifacts.options,
+                    "trained_rows": artifacts.trained_rows,
+                    "created_at": time.time(),
+                },
+                f,
+            )
+
+        pointer = os.path.join(self.root, f"CURRENT.{version}.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
+
+        self._prune(keep=version)
+        return self.open(path)
+
+    def _prune(self, keep):
+        # Workers still mapping an older version keep reading it: unlinked
+        # files stay alive until unmapped.
+        versions = sorted(
+            (name for name in os.listdir(self.root) if re.fullmatch(r"v\d+", name)),
+            key=lambda name: int(name[1:]),
+        )
+        for name in versions[:-KEEP_VERSIONS]:
+            if name != keep:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+def _writable(index, path=None):
+    # A memory-mapped index must not be modified in place (and a shallow
+    # clone_index of one still shares the mapping): take a private copy,
+    # re-reading the file when there is one (several times faster).
+    if path is not None:
+        return faiss.read_index(os.path.join(path, "index.faiss"))
+    return faiss.deserialize_index(faiss.serialize_index(index))
+
+
+def _mmap_flags():
+    # IO_FLAG_MMAP_IFC maps flat codes without copying (faiss >= 1.8); other
+    # index types ignore it and are read into memory.
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
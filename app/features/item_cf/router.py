@@ -0,0 +1,93 @@
+import json
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.shares.jobs import job_accepted
+
+router = APIRouter(prefix="/recommend/items", tags=["ItemCF Recommender"])
+
+
+@router.post("/")
+async def rebuild_item_neighbours(request: Request):
+    try:
+        lazy_model = request.app.state.models.item_cf
+        if lazy_model is None:
+            return {"error": "ItemCFRecommender model not initialized"}
+
+        async def run(job):
+            recommender_item_cf = await lazy_model.get()
+            await recommender_item_cf.rebuild()
+
+        job, created = await request.app.state.jobs.submit("item_neighbours", run)
+        return job_accepted(job, created)
+
+    except Exception as e:
+        return {
+            "error": "ItemCFRecommender not available, database not ready",
+            "details": str(e),
+        }
+
+
+@router.get("/export")
+async def export_item_recommendations(request: Request, top_n: int = 5):
+    try:
+        lazy_model = request.app.state.models.item_cf
+        if lazy_model is None:
+            return {"error": "ItemCFRecommender model not initialized"}
+
+        recommender_item_cf = await lazy_model.get()
+
+        def lines():
+            for user_id, product_ids in recommender_item_cf.iter_recommendations(top_n):
+                yield json.dumps(
+                    {
+                        "user_id": user_id,
+                        "recommendations": [{"product_id": p} for p in product_ids],
+                    }
+                ) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    except Exception as e:
+        return {
+            "error": "ItemCFRecommender not available, database not ready",
+            "details": str(e),
+        }
+
+
+@router.get("/product/{product_id}")
+async def similar_items(request: Request, product_id: str, top_n: int = 5):
+    try:
+        lazy_model = request.app.state.models.item_cf
+        if lazy_model is None:
+            return {"error": "ItemCFRecommender model not initialized"}
+
+        recommender_item_cf = await lazy_model.get()
+        recs = recommender_item_cf.similar_products(product_id, top_n=top_n)
+
+        return {"product_id": product_id, "recommendations": recs}
+
+    except Exception as e:
+        return {
+            "error": "ItemCFRecommender not available, database not ready",
+            "details": str(e),
+        }
+
+
+@router.get("/users/{user_id}")
+async def recommend_items_for_user(request: Request, user_id: str, top_n: int = 5):
+    try:
+        lazy_model = request.app.state.models.item_cf
+        if lazy_model is None:
+            return {"error": "ItemCFRecommender model not initialized"}
+
+        recommender_item_cf = await lazy_model.get()
+        recs = recommender_item_cf.recommend(user_id, top_n=top_n)
+
+        return {"user_id": user_id, "recommendations": recs}
+
+    except Exception as e:
+        return {
+            "error": "ItemCFRecommender not available, database not ready",
+            "details": str(e),
+        }
@@ -0,0 +1,144 @@
+import asyncio
+
+import numpy as np
+from scipy import sparse
+
+from app.shares.interactions import InteractionStore
+
+
+class ItemCFRecommender:
+    """
+    Item-item collaborative filtering over co-purchases.
+
+    Two products co-occur when the same user bought both. Co-occurrence
+    counts are normalized (cosine or Jaccard) and only the top-M neighbours
+    of each product are kept, so a user's recommendations are one sparse
+    row × matrix product over their purchase history.
+    """
+
+    def __init__(self, pool, top_m=50, similarity="cosine", interactions=None):
+        if similarity not in ("cosine", "jaccard"):
+            raise ValueError(f"Unknown item similarity: {similarity}")
+        self.pool = pool
+        self.store = interactions or InteractionStore(pool)
+        self.top_m = top_m
+        self.similarity = similarity
+        self.interactions = None
+        self.neighbours = None
+
+    @classmethod
+    async def from_pretrained(
+        cls, pool=None, top_m=50, similarity="cosine", interactions=None
+    ):
+        if pool is None:
+            raise ValueError("Database pool must be provided for ItemCFRecommender.")
+        instance = cls(pool, top_m=top_m, similarity=similarity, interactions=interactions)
+
+        await instance.rebuild()
+        return instance
+
+    async def rebuild(self):
+        """Reload purchases and recompute the item neighbour matrix."""
+        interactions = await self.store.refresh()
+
+        neighbours = await asyncio.to_thread(
+            build_item_neighbours, interactions.matrix, self.top_m, self.similarity
+        )
+        self.interactions, self.neighbours = interactions, neighbours
+
+    def similar_products(self, product_id, top_n=5):
+        interactions, neighbours = self.interactions, self.neighbours
+        col = interactions.products.get(product_id)
+        if col is None:
+            return []
+        row = neighbours[col]
+        order = np.lexsort((row.indices, -row.data))[:top_n]
+        return [
+            {"product_id": interactions.products[c], "score": float(s)}
+            for c, s in zip(row.indices[order], row.data[order])
+        ]
+
+    def recommend(self, user_id, top_n=5):
+        interactions, neighbours = self.interactions, self.neighbours
+        row = interactions.users.get(user_id)
+        if row is None:
+            return []
+        cols = self._rank(interactions, neighbours, np.array([row]), top_n)[0]
+        return [{"product_id": interactions.products[c]} for c in cols]
+
+    def iter_recommendations(self, top_n=5, block_rows=4096):
+        """
+        Yield (user_id, [product_id, ...]) for every user with purchases.
+        The whole export reads the snapshot current when it started, even
+        if a rebuild swaps in a new one midway.
+        """
+        interactions, neighbours = self.interactions, self.neighbours
+        n_users = len(interactions.users)
+        for start in range(0, n_users, block_rows):
+            rows = np.arange(start, min(start + block_rows, n_users))
+            for row, cols in zip(rows, self._rank(interactions, neighbours, rows, top_n)):
+                yield (
+                    interactions.users[row],
+                    [interactions.products[c] for c in cols],
+                )
+
+    def _rank(self, interactions, neighbours, rows, top_n):
+        history = interactions.matrix[rows]
+        history.data = np.ones_like(history.data)
+        scores = (history @ neighbours).tocsr()
+
+        ranked = []
+        for i in range(len(rows)):
+            cols = scores.indices[scores.indptr[i] : scores.indptr[i + 1]]
+            vals = scores.data[scores.indptr[i] : scores.indptr[i + 1]]
+            bought = history.indices[history.indptr[i] : history.indptr[i + 1]]
+            keep = ~np.isin(cols, bought)
+            cols, vals = cols[keep], vals[keep]
+            ranked.append(cols[np.lexsort((cols, -vals))[:top_n]])
+        return ranked
+
+
+def build_item_neighbours(matrix, top_m=50, similarity="cosine", block_items=2048):
+    """
+    Top-M normalized co-occurrence neighbours per product as a CSR matrix.
+    Co-occurrences are computed for blocks of products so only
+    block_items × n_products counts are alive at once.
+    """
+    bought = sparse.csr_matrix(matrix, dtype=np.float32)
+    bought.data = np.ones_like(bought.data)
+    bought_by_item = bought.T.tocsr()
+    counts = np.asarray(bought.sum(axis=0)).ravel()
+    n_items = bought.shape[1]
+
+    rows, cols, values = [], [], []
+    for start in range(0, n_items, block_items):
+        block = (bought_by_item[start : start + block_items] @ bought).tocoo()
+        r, c, co = block.row + start, block.col, block.data
+        off_diagonal = r != c
+        r, c, co = r[off_diagonal], c[off_diagonal], co[off_diagonal]
+
+        if similarity == "cosine":
+            sim = co / np.sqrt(counts[r] * counts[c])
+        else:
+            sim = co / (counts[r] + counts[c] - co)
+
+        # Keep the top_m neighbours of each product in the block.
+        order = np.lexsort((c, -sim, r))
+        r, c, sim = r[order], c[order], sim[order]
+        row_start = np.searchsorted(r, r, side="left")
+        keep = np.arange(len(r)) - row_start < top_m
+        rows.append(r[keep])
+        cols.append(c[keep])
+        values.append(sim[keep])
+
+    return sparse.csr_matrix(
+        (
+            np.concatenate(values) if values else np.empty(0, dtype=np.float32),
+            (
+                np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+                np.concatenate(cols) if cols else np.empty(0, dtype=np.int64),
+            ),
+        ),
+        shape=(n_items, n_items),
+        dtype=np.float32,
+    )
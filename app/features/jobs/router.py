@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/")
+async def list_jobs(request: Request):
+    jobs = request.app.state.jobs
+    return {"jobs": [job.to_dict() for job in await jobs.list()]}
+
+
+@router.get("/{job_id}")
+async def get_job(request: Request, job_id: str):
+    job = await request.app.state.jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return job.to_dict()
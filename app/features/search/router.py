@@ -0,0 +1,36 @@
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.features.search.service import semantic_search
+
+router = APIRouter(prefix="/search", tags=["Semantic Search"])
+
+
+@router.get("/semantic")
+async def search_semantic(
+    q: str,
+    top_n: int = 10,
+    brand: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+):
+    query = q.strip()
+    if not query:
+        return JSONResponse(status_code=400, content={"error": "Query q must not be empty"})
+
+    try:
+        products = await semantic_search.search(
+            query, top_n=top_n, brand=brand, min_price=min_price, max_price=max_price
+        )
+        return {
+            "query": query,
+            "filters": {"brand": brand, "min_price": min_price, "max_price": max_price},
+            "products": products,
+        }
+    except Exception as e:
+        return {
+            "error": "Semantic search not available, content index not ready",
+            "details": str(e),
+        }
@@ -0,0 +1,44 @@
+import asyncio
+
+
+class SemanticSearch:
+    """
+    In-process semantic product search over the ContentRecommender index,
+    shared by GET /search/semantic and callers without a request (the
+    chatbot tools). Bound to the content_based LazyModel at startup.
+    """
+
+    def __init__(self, content_model=None):
+        self.content_model = content_model
+
+    def bind(self, content_model):
+        self.content_model = content_model
+
+    async def warm_up(self):
+        """Load the content index, then the query encoder, ahead of the first search."""
+        if self.content_model is None:
+            raise RuntimeError("Semantic search is not bound to a ContentRecommender")
+        try:
+            recommender = await self.content_model.get()
+            await recommender.load_model()
+        except Exception as e:
+            # Searches retry the load; the warm-up only gets it out of the way.
+            print(f"Semantic search warm-up failed: {e!r}")
+
+    async def search(self, query, top_n=10, brand=None, min_price=None, max_price=None):
+        if self.content_model is None:
+            raise RuntimeError("Semantic search is not bound to a ContentRecommender")
+        recommender = await self.content_model.get()
+        recommender.revalidate()
+        # Query encoding is CPU-bound: keep it off the event loop.
+        return await asyncio.to_thread(
+            recommender.search,
+            query,
+            top_n=top_n,
+            brand=brand,
+            min_price=min_price,
+            max_price=max_price,
+        )
+
+
+semantic_search = SemanticSearch()
@@ -0,0 +1,111 @@
+import faiss
+import numpy as np
+
+
+class UserANNIndex:
+    """
+    Approximate neighbour search over standardized user vectors.
+
+    Each user is embedded as sqrt(0.5) * [centered / ||centered||, x / ||x||],
+    so the inner product of two embeddings is exactly the combined
+    0.5 * pearson + 0.5 * cosine score of SimilarityEngine. The index is
+    searched with METRIC_INNER_PRODUCT and exposes the same top_k /
+    top_k_block / iter_top_k interface as the exact engine.
+    """
+
+    def __init__(self, index, engine, options):
+        self.index = index
+        self.engine = engine
+        self.options = options
+
+    def __len__(self):
+        return len(self.engine)
+
+    @classmethod
+    def build(cls, engine, kind="hnsw", hnsw_m=32, ef_search=64, nlist=0, nprobe=16):
+        options = dict(
+            kind=kind, hnsw_m=hnsw_m, ef_search=ef_search, nlist=nlist, nprobe=nprobe
+        )
+        n_users = len(engine)
+        dim = 2 * engine.n_features
+
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = ef_search
+        elif kind == "ivf":
+            nlist = nlist or max(1, min(int(4 * np.sqrt(n_users)), n_users))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            sample = np.random.default_rng(0).choice(
+                n_users, size=min(n_users, 256 * nlist), replace=False
+            )
+            index.train(embed_users(engine, np.sort(sample)))
+            index.nprobe = nprobe
+        else:
+            raise ValueError(f"Unknown user_cf ANN index type: {kind}")
+
+        for rows in _blocks(n_users, 20000):
+            index.add(embed_users(engine, rows))
+        return cls(index, engine, options)
+
+    def updated(self, engine, rows):
+        """
+        Index for a refreshed engine whose given rows changed or were appended,
+        built on a copy so searches on the current index keep running. IVF
+        lists support removal, so those rows are re-added. HNSW graphs cannot
+        drop vectors: appended users are inserted, while users whose vectors
+        changed keep their old graph entry until the periodic full rebuild
+        (user_cf_full_rebuild_interval) rebuilds the graph.
+        """
+        index = faiss.clone_index(self.index)
+        if self.options["kind"] != "ivf":
+            for new_rows in _blocks(len(engine) - index.ntotal, 20000):
+                index.add(embed_users(engine, new_rows + self.index.ntotal))
+            return UserANNIndex(index, engine, self.options)
+
+        rows = np.asarray(rows, dtype=np.int64)
+        index.remove_ids(rows)
+        index.add_with_ids(embed_users(engine, rows), rows)
+        return UserANNIndex(index, engine, self.options)
+
+    def top_k(self, row: int, k: int = 5):
+        neighbours, weights = self.top_k_block([row], k)
+        valid = neighbours[0] >= 0
+        return neighbours[0][valid], weights[0][valid]
+
+    def top_k_block(self, rows, k: int = 5):
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        scores, found = self.index.search(embed_users(self.engine, rows), k + 1)
+
+        neighbours = np.full((len(rows), k), -1, dtype=np.int64)
+        weights = np.zeros((len(rows), k))
+        for i, row in enumerate(rows):
+            keep = (found[i] >= 0) & (found[i] != row)
+            idx, score = found[i][keep][:k], scores[i][keep][:k]
+            neighbours[i, : len(idx)] = idx
+            weights[i, : len(idx)] = score
+        return neighbours, weights
+
+    def block_size(self, memory_budget_mb: int = 512) -> int:
+        # Only the query embeddings of a block are materialized.
+        dim = 2 * self.engine.n_features
+        return max(1, int(memory_budget_mb * 2**20 // (3 * 4 * dim)))
+
+    def iter_top_k(self, k: int = 5, memory_budget_mb: int = 512):
+        for rows in _blocks(len(self), self.block_size(memory_budget_mb)):
+            yield (rows, *self.top_k_block(rows, k))
+
+
+def embed_users(engine, rows) -> np.ndarray:
+    rows = np.asarray(rows, dtype=np.int64)
+    dense = engine.matrix[rows].toarray()
+    centered = (dense - engine.means[rows, None]) * engine.inv_centered_norms[rows, None]
+    normalized = dense * engine.inv_norms[rows, None]
+    return np.ascontiguousarray(
+        np.hstack([centered, normalized]) * np.sqrt(0.5), dtype=np.float32
+    )
+
+
+def _blocks(n_rows, block_rows):
+    for start in range(0, n_rows, block_rows):
+        yield np.arange(start, min(start + block_rows, n_rows))
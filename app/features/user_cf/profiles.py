@@ -0,0 +1,125 @@
+import numpy as np
+from scipy import sparse
+
+from app.shares.id_index import IdIndex
+
+
+USERS_QUERY = "SELECT id FROM users;"
+
+ORDER_TOTALS_QUERY = """
+    SELECT o.user_id, COUNT(*) AS order_count, SUM(o.total_amount) AS total_spent
+    FROM orders o
+    {where}
+    GROUP BY o.user_id;
+"""
+
+ITEM_QUANTITY_QUERY = """
+    SELECT o.user_id, {key} AS key, SUM(oi.quantity) AS qty
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
+    JOIN products p ON p.product_id = pv.product_id
+    JOIN categories c ON c.id = p.category_id
+    WHERE p.status = 'APPROVED'{and_where}
+    GROUP BY o.user_id, {key};
+"""
+
+
+class UserFeatureMatrix:
+    """
+    Sparse user × feature matrix.
+
+    Column layout: [order_count, total_spent, *categories, *brands], with
+    categories and brands in the sorted order kept by UserCFRecommender.
+    """
+
+    def __init__(self, users: IdIndex, matrix: sparse.csr_matrix, categories, brands):
+        self.users = users
+        self.matrix = matrix
+        self.categories = list(categories)
+        self.brands = list(brands)
+
+    def __len__(self):
+        return len(self.users)
+
+    @property
+    def n_features(self):
+        return 2 + len(self.categories) + len(self.brands)
+
+    def vector(self, row: int) -> np.ndarray:
+        return self.matrix[row].toarray().ravel()
+
+    def upserted(self, delta: "UserFeatureMatrix") -> "UserFeatureMatrix":
+        """
+        New matrix with the rows of the users in delta replaced and users not
+        seen before appended. Rows of every other user keep their position,
+        and self is left untouched for readers still holding it.
+        """
+        users = self.users.copy()
+        positions = users.add_many(delta.users.ids)
+        n_users = len(users)
+
+        matrix = self.matrix
+        if n_users > matrix.shape[0]:
+            padding = sparse.csr_matrix((n_users - matrix.shape[0], matrix.shape[1]))
+            matrix = sparse.vstack([matrix, padding], format="csr")
+
+        keep = np.ones(n_users)
+        keep[positions] = 0.0
+        placement = sparse.csr_matrix(
+            (np.ones(len(positions)), (positions, np.arange(len(positions)))),
+            shape=(n_users, len(positions)),
+        )
+        matrix = (sparse.diags(keep) @ matrix + placement @ delta.matrix).tocsr()
+        return UserFeatureMatrix(users, matrix, self.categories, self.brands)
+
+
+async def load_user_features(conn, categories, brands, user_ids=None):
+    """
+    Build feature rows with four set-based queries instead of one query per
+    user and per order. Rows follow the `users` table order; when user_ids is
+    given only those users are loaded, in that order.
+    """
+    category_cols = {name: 2 + i for i, name in enumerate(categories)}
+    brand_cols = {name: 2 + len(categories) + i for i, name in enumerate(brands)}
+
+    if user_ids is None:
+        args = ()
+        rows = await conn.fetch(USERS_QUERY)
+        users = IdIndex(row["id"] for row in rows)
+        where, and_where = "", ""
+    else:
+        users = IdIndex(user_ids)
+        args = (users.ids,)
+        where = "WHERE o.user_id = ANY($1)"
+        and_where = "\n    AND o.user_id = ANY($1)"
+
+    row_idx, col_idx, values = [], [], []
+
+    for row in await conn.fetch(ORDER_TOTALS_QUERY.format(where=where), *args):
+        pos = users.get(row["user_id"])
+        if pos is None:
+            continue
+        row_idx += [pos, pos]
+        col_idx += [0, 1]
+        values += [row["order_count"], float(row["total_spent"] or 0)]
+
+    for key, columns in (("c.name", category_cols), ("p.brand", brand_cols)):
+        query = ITEM_QUANTITY_QUERY.format(key=key, and_where=and_where)
+        for row in await conn.fetch(query, *args):
+            pos = users.get(row["user_id"])
+            col = columns.get(row["key"])
+            if pos is None or col is None:
+                continue
+            row_idx.append(pos)
+            col_idx.append(col)
+            values.append(row["qty"])
+
+    matrix = sparse.csr_matrix(
+        (
+            np.asarray(values, dtype=np.float64),
+            (np.asarray(row_idx, dtype=np.int64), np.asarray(col_idx, dtype=np.int64)),
+        ),
+        shape=(len(users), 2 + len(categories) + len(brands)),
+    )
+    return UserFeatureMatrix(users, matrix, categories, brands)
@@ -1,23 +1,94 @@
+import json
+
 from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.features.user_cf.schemas import BatchRecommendRequest
+from app.shares.jobs import job_accepted
 
 router = APIRouter(prefix="/recommend/users", tags=["UserCF Recommender"])
 
 
 @router.post("/")
 async def update_user_recommendations(request: Request, top_n: int = 5):
+    try:
+        lazy_model = request.app.state.models.user_cf
+        if lazy_model is None:
+            return {"error": "UserCFRecommender model not initialized"}
+
+        async def run(job):
+            recommender_user_cf = await lazy_model.get()
+            await recommender_user_cf.update_suggested_products_for_all_users(
+                top_n=top_n, progress=job.report
+            )
+
+        job, created = await request.app.state.jobs.submit(
+            "user_suggestions", run, top_n=top_n
+        )
+        return job_accepted(job, created)
+
+    except Exception as e:
+        return {
+            "error": "UserCFRecommender not available, database not ready",
+            "details": str(e),
+        }
+
+
+@router.post("/batch")
+async def recommend_users_batch(request: Request, body: BatchRecommendRequest):
     try:
         lazy_model = request.app.state.models.user_cf
         if lazy_model is None:
             return {"error": "UserCFRecommender model not initialized"}
 
         recommender_user_cf = await lazy_model.get()
-        await recommender_user_cf.update_suggested_products_for_all_users(top_n=top_n)
 
+        async def lines():
+            async for user_id, recs in recommender_user_cf.iter_recommendations(
+                body.user_ids, top_n=body.top_n
+            ):
+                yield json.dumps({"user_id": user_id, "recommendations": recs}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    except Exception as e:
         return {
-            "status": "success",
-            "message": "Updated suggested products for all users.",
+            "error": "UserCFRecommender not available, database not ready",
+            "details": str(e),
         }
 
+
+@router.post("/refresh")
+async def refresh_user_profiles(request: Request, full: bool = False):
+    try:
+        lazy_model = request.app.state.models.user_cf
+        if lazy_model is None:
+            return {"error": "UserCFRecommender model not initialized"}
+
+        recommender_user_cf = await lazy_model.get()
+        if full:
+            await recommender_user_cf.rebuild()
+        else:
+            await recommender_user_cf.refresh()
+
+        return {"status": "success", "stats": recommender_user_cf.stats()}
+
+    except Exception as e:
+        return {
+            "error": "UserCFRecommender not available, database not ready",
+            "details": str(e),
+        }
+
+
+@router.get("/stats")
+async def user_profile_stats(request: Request):
+    try:
+        lazy_model = request.app.state.models.user_cf
+        if lazy_model is None:
+            return {"error": "UserCFRecommender model not initialized"}
+
+        recommender_user_cf = await lazy_model.get()
+        return recommender_user_cf.stats()
+
     except Exception as e:
         return {
             "error": "UserCFRecommender not available, database not ready",
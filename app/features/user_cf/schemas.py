@@ -0,0 +1,7 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class BatchRecommendRequest(BaseModel):
+    user_ids: list[str]
+    top_n: int = 5
+    model_config = ConfigDict(extra="forbid")
@@ -0,0 +1,46 @@
+import numpy as np
+from scipy import sparse
+
+
+def rank_candidates(neighbours, weights, purchases, targets, top_n=5):
+    """
+    Score products bought by each target's neighbours as sum(qty * weight),
+    skip products the target already bought, and return the top_n product
+    columns per target (highest score first).
+
+    neighbours / weights: (n_targets, k) arrays, -1 marks a missing neighbour.
+    weights[i, j] is neighbour j's own similarity to target i. The original
+    per-user loop took combined_scores[idx][0] from the sorted list, i.e.
+    another user's score, so scores and rankings intentionally differ
+    from it.
+    purchases: user × product quantity matrix whose rows line up with the
+    similarity engine's rows.
+    """
+    n_targets, k = neighbours.shape
+    valid = neighbours >= 0
+    target_idx = np.broadcast_to(np.arange(n_targets)[:, None], (n_targets, k))
+    weight_matrix = sparse.csr_matrix(
+        (weights[valid], (target_idx[valid], neighbours[valid])),
+        shape=(n_targets, purchases.shape[0]),
+    )
+    scores = (weight_matrix @ purchases).tocsr()
+    bought = purchases[np.asarray(targets)]
+
+    ranked = []
+    for i in range(n_targets):
+        cols = scores.indices[scores.indptr[i] : scores.indptr[i + 1]]
+        vals = scores.data[scores.indptr[i] : scores.indptr[i + 1]]
+        keep = ~np.isin(cols, bought.indices[bought.indptr[i] : bought.indptr[i + 1]])
+        cols, vals = cols[keep], vals[keep]
+        ranked.append(cols[np.lexsort((cols, -vals))[:top_n]])
+    return ranked
+
+
+def recommend_all(index, purchases, top_n=5, n_neighbours=5, memory_budget_mb=512):
+    """
+    Yield (row, product columns) for every user of a neighbour index
+    (SimilarityEngine or UserANNIndex).
+    """
+    for rows, neighbours, weights in index.iter_top_k(n_neighbours, memory_budget_mb):
+        ranked = rank_candidates(neighbours, weights, purchases, rows, top_n)
+        yield from zip(rows, ranked)
@@ -1,22 +1,44 @@
+import asyncio
+import time
+
 import numpy as np
-from scipy.stats import pearsonr
-from sklearn.metrics.pairwise import cosine_similarity
-from collections import defaultdict
+
+from app.configs.settings import settings
+from app.features.user_cf.ann import UserANNIndex
+from app.features.user_cf.profiles import load_user_features
+from app.features.user_cf.scoring import rank_candidates, recommend_all
+from app.features.user_cf.similarity import SimilarityEngine
+from app.shares.interactions import InteractionStore
+from app.shares.jobs import no_progress
+from app.shares.publish import publish_table
 
 
 class UserCFRecommender:
-    def __init__(self, pool):
+    def __init__(self, pool, interactions=None):
         self.pool = pool
+        self.interactions = interactions or InteractionStore(pool)
         self.all_categories = []
         self.all_brands = []
 
+        # Resident feature matrix, refreshed from orders.created_at
+        self.profiles = None
+        self.engine = None
+        self.ann_index = None
+        self.watermark = None
+        self.last_refresh_at = None
+        self.last_full_rebuild_at = None
+        self.last_refresh_seconds = None
+        self.last_full_rebuild_seconds = None
+        self._refresh_lock = asyncio.Lock()
+        self._revalidation = None
+
     @classmethod
-    async def from_pretrained(cls, pool=None):
+    async def from_pretrained(cls, pool=None, interactions=None):
         if pool is None:
             raise ValueError("Database pool must be provided for UserCFRecommender.")
-        instance = cls(pool)
+        instance = cls(pool, interactions=interactions)
 
-        await instance._load_dimensions()
+        await instance.rebuild()
         return instance
 
     async def _load_dimensions(self):
@@ -27,180 +49,226 @@ class UserCFRecommender:
             rows = await conn.fetch("SELECT DISTINCT brand FROM products WHERE status = 'APPROVED';")
             self.all_brands = sorted([row["brand"] for row in rows])
 
-    async def _create_user_profiles(self):
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch("SELECT id, username, email FROM users;")
-            users = [
-                {"id": row["id"], "username": row["username"], "email": row["email"]}
-                for row in rows
-            ]
-
-            profiles = []
-            for user in users:
-                profile = {
-                    "user_id": user["id"],
-                    "username": user["username"],
-                    "email": user["email"],
-                    "order_count": 0,
-                    "total_spent": 0.0,
-                    "categories": {cat: 0 for cat in self.all_categories},
-                    "brand_preferences": {brand: 0 for brand in self.all_brands},
-                }
-
-                orders = await conn.fetch(
-                    "SELECT o.order_id, o.total_amount FROM orders o WHERE o.user_id = $1;",
-                    user["id"],
-                )
-                profile["order_count"] = len(orders)
-
-                for order in orders:
-                    profile["total_spent"] += float(order["total_amount"])
-
-                    items = await conn.fetch(
-                        """
-                        SELECT p.product_id, p.brand, c.name, oi.quantity
-                        FROM order_items oi
-                        JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
-                        JOIN products p ON p.product_id = pv.product_id
-                        JOIN categories c ON c.id = p.category_id
-                        WHERE oi.order_id = $1
-                        AND p.status = 'APPROVED';
-                        """,
-                        order["order_id"],
-                    )
-
-                    for row in items:
-                        brand, category_name, qty = (
-                            row["brand"],
-                            row["category_name"],
-                            row["quantity"],
-                        )
-
-                        if category_name in profile["categories"]:
-                            profile["categories"][category_name] += qty
-                        if brand in profile["brand_preferences"]:
-                            profile["brand_preferences"][brand] += qty
-
-                profiles.append(profile)
-            return profiles
-
-    def _profile_to_vector(self, profile):
-        vector = [profile["order_count"], profile["total_spent"]]
-        vector.extend(profile["categories"][cat] for cat in self.all_categories)
-        vector.extend(profile["brand_preferences"][brand] for brand in self.all_brands)
-        return np.array(vector, dtype=float)
-
-    def _compute_similarity(self, target_vector, other_vectors):
-        pearson_scores, cosine_scores = [], []
-        for v in other_vectors:
-            if np.std(target_vector) == 0 or np.std(v) == 0:
-                p_score = 0.0
-            else:
-                p_score, _ = pearsonr(target_vector, v)
-                if np.isnan(p_score):
-                    p_score = 0.0
-            pearson_scores.append(p_score)
-            cosine_scores.append(cosine_similarity([target_vector], [v])[0][0])
-        return pearson_scores, cosine_scores
-
-    def _find_top_similar_users(self, target_profile, profiles, n=5):
-        target_vector = self._profile_to_vector(target_profile)
-        other_profiles = [
-            p for p in profiles if p["user_id"] != target_profile["user_id"]
-        ]
-        other_vectors = [self._profile_to_vector(p) for p in other_profiles]
-
-        pearson_scores, cosine_scores = self._compute_similarity(
-            target_vector, other_vectors
-        )
-        combined_scores = [
-            (0.5 * p + 0.5 * c, idx)
-            for idx, (p, c) in enumerate(zip(pearson_scores, cosine_scores))
-        ]
-        combined_scores.sort(reverse=True)
-        top_indices = [idx for _, idx in combined_scores[:n]]
-        return [(other_profiles[idx], combined_scores[idx][0]) for idx in top_indices]
-
-    async def _get_purchased_products(self, user_id):
+    async def _create_user_profiles(self, user_ids=None):
         async with self.pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT DISTINCT p.product_id
-                FROM order_items oi
-                JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
-                JOIN products p ON p.product_id = pv.product_id
-                JOIN orders o ON o.order_id = oi.order_id
-                WHERE o.user_id = $1
-                AND p.status = 'APPROVED';
-                """,
-                user_id,
+            return await load_user_features(
+                conn, self.all_categories, self.all_brands, user_ids=user_ids
             )
-            return set(row["product_id"] for row in rows)
 
-    async def recommend_products(self, target_user_id, top_n=5):
+    async def rebuild(self):
+        """Reload dimensions and every user's features."""
+        async with self._refresh_lock:
+            await self._rebuild()
+
+    async def _rebuild(self):
+        start = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            # Read the watermark first: orders landing during the load are
+            # picked up again by the next incremental refresh.
+            watermark = await conn.fetchval("SELECT MAX(created_at) FROM orders;")
+
+        await self._load_dimensions()
         profiles = await self._create_user_profiles()
-        target_profile = next(
-            (p for p in profiles if p["user_id"] == target_user_id), None
-        )
-        if not target_profile:
-            return []
+        engine = SimilarityEngine(profiles.matrix)
+        ann_index = None
+        if settings.user_cf_similarity == "ann":
+            ann_index = await asyncio.to_thread(
+                UserANNIndex.build,
+                engine,
+                kind=settings.user_cf_ann_index,
+                hnsw_m=settings.user_cf_ann_hnsw_m,
+                ef_search=settings.user_cf_ann_ef_search,
+                nlist=settings.user_cf_ann_nlist,
+                nprobe=settings.user_cf_ann_nprobe,
+            )
+        # Swap everything at once: requests keep the old snapshot until here.
+        self.profiles, self.engine, self.ann_index = profiles, engine, ann_index
+        self.watermark = watermark
+
+        self.last_full_rebuild_seconds = time.perf_counter() - start
+        self.last_refresh_seconds = self.last_full_rebuild_seconds
+        self.last_full_rebuild_at = self.last_refresh_at = time.time()
 
-        similar_users = self._find_top_similar_users(target_profile, profiles, n=5)
-        target_products = await self._get_purchased_products(target_user_id)
+    async def refresh(self):
+        """Fold in users that placed orders since the watermark."""
+        async with self._refresh_lock:
+            await self._refresh()
 
-        product_scores = defaultdict(float)
+    async def _refresh(self):
+        start = time.perf_counter()
         async with self.pool.acquire() as conn:
-            for user, weight in similar_users:
+            if self.watermark is None:
+                rows = await conn.fetch(
+                    "SELECT user_id, MAX(created_at) AS last_order FROM orders GROUP BY user_id;"
+                )
+            else:
                 rows = await conn.fetch(
                     """
-                    SELECT p.product_id, p.name, SUM(oi.quantity) as qty
-                    FROM order_items oi
-                    JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
-                    JOIN products p ON p.product_id = pv.product_id
-                    JOIN orders o ON o.order_id = oi.order_id
-                    WHERE o.user_id = $1
-                    AND p.status = 'APPROVED'
-                    GROUP BY p.product_id, p.name;
+                    SELECT user_id, MAX(created_at) AS last_order
+                    FROM orders
+                    WHERE created_at > $1
+                    GROUP BY user_id;
                     """,
-                    user["user_id"],
+                    self.watermark,
                 )
-                for product_id, name, qty in rows:
-                    if product_id not in target_products:
-                        product_scores[(product_id, name)] += qty * weight
 
-        sorted_products = sorted(
-            product_scores.items(), key=lambda x: x[1], reverse=True
-        )[:top_n]
-        return [{"product_id": pid} for (pid, _), _ in sorted_products]
+        if rows:
+            delta = await self._create_user_profiles(
+                user_ids=[row["user_id"] for row in rows]
+            )
+            profiles = self.profiles.upserted(delta)
+            engine = SimilarityEngine(profiles.matrix)
+            ann_index = self.ann_index
+            if ann_index is not None:
+                changed = profiles.users.get_many(delta.users.ids)
+                ann_index = await asyncio.to_thread(ann_index.updated, engine, changed)
+            # Swap everything at once: requests keep the old snapshot until here.
+            self.profiles, self.engine, self.ann_index = profiles, engine, ann_index
+            self.watermark = max(row["last_order"] for row in rows)
+
+        self.last_refresh_seconds = time.perf_counter() - start
+        self.last_refresh_at = time.time()
+
+    def _ensure_fresh(self):
+        """
+        Stale-while-revalidate: requests keep scoring against the current
+        snapshot while one background task refreshes or rebuilds it.
+        """
+        if self._is_stale() and self._revalidation is None:
+            self._revalidation = asyncio.create_task(self._revalidate())
+            self._revalidation.add_done_callback(self._revalidated)
+
+    async def _revalidate(self):
+        async with self._refresh_lock:
+            # Another request may have refreshed while we waited on the lock.
+            now = time.time()
+            if now - self.last_full_rebuild_at >= settings.user_cf_full_rebuild_interval:
+                await self._rebuild()
+            elif now - self.last_refresh_at >= settings.user_cf_refresh_interval:
+                await self._refresh()
+
+    def _revalidated(self, task):
+        self._revalidation = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background UserCF refresh failed: {task.exception()!r}")
 
-    async def update_suggested_products_for_all_users(self, top_n=5):
+    def _is_stale(self):
+        now = time.time()
+        return (
+            now - self.last_refresh_at >= settings.user_cf_refresh_interval
+            or now - self.last_full_rebuild_at >= settings.user_cf_full_rebuild_interval
+        )
+
+    def stats(self):
+        now = time.time()
+        return {
+            "users": len(self.profiles),
+            "features": self.profiles.n_features,
+            "similarity": "ann" if self.ann_index is not None else "exact",
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "staleness_seconds": now - self.last_refresh_at,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "since_full_rebuild_seconds": now - self.last_full_rebuild_at,
+            "last_full_rebuild_seconds": self.last_full_rebuild_seconds,
+            "interactions": self.interactions.stats(),
+        }
+
+    def _neighbour_index(self):
+        """Exact engine, or the FAISS index when user_cf_similarity = "ann"."""
+        return self.ann_index if self.ann_index is not None else self.engine
+
+    def _recommend_block(self, profiles, neighbours, interactions, rows, top_n):
+        """Product ids for each target row, scoring the rows as one block."""
+        neighbour_rows, weights = neighbours.top_k_block(rows, 5)
+
+        # Only the purchases of the targets and their neighbours are needed.
+        local = np.unique(np.concatenate([rows, neighbour_rows[neighbour_rows >= 0]]))
+        purchases = interactions.rows_for([profiles.users[row] for row in local])
+        local_neighbours = np.where(
+            neighbour_rows >= 0, np.searchsorted(local, neighbour_rows), -1
+        )
+        ranked = rank_candidates(
+            local_neighbours, weights, purchases, np.searchsorted(local, rows), top_n
+        )
+        return [[interactions.products[col] for col in cols] for cols in ranked]
+
+    async def recommend_products(self, target_user_id, top_n=5):
+        self._ensure_fresh()
+        interactions = await self.interactions.get()
+        profiles, neighbours = self.profiles, self._neighbour_index()
+        target_row = profiles.users.get(target_user_id)
+        if target_row is None:
+            return []
+
+        product_ids = self._recommend_block(
+            profiles, neighbours, interactions, np.array([target_row]), top_n
+        )[0]
+        return [{"product_id": product_id} for product_id in product_ids]
+
+    async def iter_recommendations(self, user_ids, top_n=5):
+        """
+        Yield (user_id, recommendations) for many users in request order.
+        Targets are scored in blocks sized by user_cf_batch_memory_mb;
+        unknown users get an empty list.
+        """
+        self._ensure_fresh()
+        interactions = await self.interactions.get()
+        profiles, neighbours = self.profiles, self._neighbour_index()
+        rows = profiles.users.get_many(user_ids)
+        block = neighbours.block_size(settings.user_cf_batch_memory_mb)
+
+        for start in range(0, len(user_ids), block):
+            block_ids, block_rows = user_ids[start : start + block], rows[start : start + block]
+            known = block_rows >= 0
+            recs = iter(
+                await asyncio.to_thread(
+                    self._recommend_block,
+                    profiles,
+                    neighbours,
+                    interactions,
+                    block_rows[known],
+                    top_n,
+                )
+                if known.any()
+                else []
+            )
+            for user_id, is_known in zip(block_ids, known):
+                product_ids = next(recs) if is_known else []
+                yield user_id, [{"product_id": product_id} for product_id in product_ids]
+
+    async def update_suggested_products_for_all_users(self, top_n=5, progress=no_progress):
+        progress(0.0, "refreshing profiles")
+        await self.refresh()
+        interactions = await self.interactions.refresh()
+        profiles, neighbours = self.profiles, self._neighbour_index()
+
+        progress(0.2, "scoring users")
+        insert_values = await asyncio.to_thread(
+            self._recommend_all, profiles, neighbours, interactions, top_n
+        )
+
+        progress(0.8, "writing suggestions")
         async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                await conn.execute("TRUNCATE TABLE product_suggested_for_user")
-
-                rows = await conn.fetch("SELECT id FROM users")
-                all_users = [row["id"] for row in rows]
-
-                insert_values = []
-
-                for user_id in all_users:
-                    recs = await self.recommend_products(user_id, top_n=top_n)
-                    for r in recs:
-                        # await conn.execute(
-                        #     """
-                        #     INSERT INTO product_suggested_for_user (user_id, product_id)
-                        #     VALUES ($1, $2)
-                        #     """,
-                        #     str(user_id),
-                        #     str(r["product_id"]),
-                        # )
-
-                        insert_values.append((str(user_id), str(r["product_id"])))
-
-                if insert_values:
-                    await conn.executemany(
-                        "INSERT INTO product_suggested_for_user (user_id, product_id) VALUES ($1, $2)",
-                        insert_values,
-                    )
+            await publish_table(
+                conn,
+                "product_suggested_for_user",
+                ["user_id", "product_id"],
+                insert_values,
+            )
 
         print("All users' suggested products updated successfully.")
+
+    def _recommend_all(self, profiles, neighbours, interactions, top_n):
+        purchases = interactions.rows_for(profiles.users.ids)
+        insert_values = []
+        for row, product_cols in recommend_all(
+            neighbours,
+            purchases,
+            top_n=top_n,
+            memory_budget_mb=settings.user_cf_batch_memory_mb,
+        ):
+            user_id = profiles.users[row]
+            insert_values.extend(
+                (user_id, interactions.products[col]) for col in product_cols
+            )
+        return insert_values
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from types import SimpleNamespace
 from app.features.FPGrowth.service import FPGrowthRecommender
@@ -6,6 +7,8 @@ from app.features.embedding.service import PhoBERTEmbedding
 from app.features.search_by_image.service import SearchByImageService
 from app.features.sentiment.service import SentimentAnalyzer
 from app.features.user_cf.service import UserCFRecommender
+from app.features.item_cf.service import ItemCFRecommender
+from app.features.als.service import ALSRecommender
 from app.features.face_authentication.service import FaceService
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
@@ -14,7 +17,10 @@ from app.configs.settings import settings
 from app.routes import api_router
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.features.content_based.service import ContentRecommender
+from app.features.search.service import semantic_search
 from app.shares.layzy_model import LazyModel
+from app.shares.interactions import InteractionStore
+from app.shares.jobs import JobRunner
 from app.configs.mongo import collection
 
 from app.configs.database import (
@@ -22,6 +28,7 @@ from app.configs.database import (
     init_db_pool,
     close_db_pool,
     get_db_pool,
+    open_db_connection,
 )
 
 
@@ -32,6 +39,18 @@ def create_app() -> FastAPI:
         await init_db_pool()
 
         pool = get_db_pool()
+        interactions = InteractionStore(
+            pool,
+            refresh_interval=settings.interactions_refresh_interval,
+            full_rebuild_interval=settings.interactions_full_rebuild_interval,
+        )
+        app.state.jobs = JobRunner(
+            pool,
+            open_db_connection,
+            max_concurrency=settings.jobs_max_concurrency,
+            history_size=settings.jobs_history_size,
+        )
+        await app.state.jobs.start()
 
         app.state.models = SimpleNamespace(
             sentiment=LazyModel(
@@ -49,14 +68,38 @@ def create_app() -> FastAPI:
                     model_name="all-MiniLM-L6-v2", pool=pool
                 )
             ),
-            user_cf=LazyModel(lambda: UserCFRecommender.from_pretrained(pool)),
+            user_cf=LazyModel(
+                lambda: UserCFRecommender.from_pretrained(
+                    pool, interactions=interactions
+                )
+            ),
+            item_cf=LazyModel(
+                lambda: ItemCFRecommender.from_pretrained(
+                    pool,
+                    top_m=settings.item_cf_neighbours,
+                    similarity=settings.item_cf_similarity,
+                    interactions=interactions,
+                )
+            ),
+            als=LazyModel(
+                lambda: ALSRecommender.from_pretrained(pool, interactions=interactions)
+            ),
             face_auth=LazyModel(lambda: FaceService.from_pretrained(collection)),  
             search_by_image=LazyModel(lambda: SearchByImageService.from_pretrained()),      
         )
+        semantic_search.bind(app.state.models.content_based)
+        semantic_warm_up = None
+        if settings.chatbot_catalog_search == "semantic":
+            # The chatbot searches the index in every worker: load it and the
+            # query encoder now rather than on the first chat message.
+            semantic_warm_up = asyncio.create_task(semantic_search.warm_up())
 
 
         yield
         # SHUTDOWN
+        if semantic_warm_up is not None:
+            semantic_warm_up.cancel()
+        await app.state.jobs.shutdown()
         await cleanup_idle_connections(pool)
         await close_db_pool()
 
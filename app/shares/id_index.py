@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class IdIndex:
+    """Intern UUID/text keys into dense, stable integer positions."""
+
+    def __init__(self, ids=()):
+        self.ids = []
+        self._positions = {}
+        for key in ids:
+            self.add(key)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return str(key) in self._positions
+
+    def __getitem__(self, position):
+        return self.ids[position]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def copy(self) -> "IdIndex":
+        clone = IdIndex()
+        clone.ids = list(self.ids)
+        clone._positions = dict(self._positions)
+        return clone
+
+    def add(self, key) -> int:
+        """Return the position of key, appending it if it is new."""
+        key = str(key)
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self.ids)
+            self.ids.append(key)
+            self._positions[key] = position
+        return position
+
+    def get(self, key, default=None):
+        return self._positions.get(str(key), default)
+
+    def add_many(self, keys) -> np.ndarray:
+        return np.fromiter((self.add(k) for k in keys), dtype=np.int64)
+
+    def get_many(self, keys) -> np.ndarray:
+        """Positions for keys, -1 where a key is unknown."""
+        return np.fromiter(
+            (self._positions.get(str(k), -1) for k in keys), dtype=np.int64
+        )
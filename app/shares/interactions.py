@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+import numpy as np
+from scipy import sparse
+
+from app.shares.id_index import IdIndex
+
+
+INTERACTIONS_QUERY = """
+    SELECT o.user_id, p.product_id, SUM(oi.quantity) AS qty, MAX(o.created_at) AS last_order
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    JOIN product_variants pv ON pv.product_variant_id = oi.product_variant_id
+    JOIN products p ON p.product_id = pv.product_id
+    WHERE p.status = 'APPROVED'{and_where}
+    GROUP BY o.user_id, p.product_id;
+"""
+
+
+class InteractionMatrix:
+    """User × product purchased-quantity matrix over APPROVED products."""
+
+    def __init__(
+        self, users: IdIndex, products: IdIndex, matrix: sparse.csr_matrix, watermark=None
+    ):
+        self.users = users
+        self.products = products
+        self.matrix = matrix
+        self.watermark = watermark
+
+    def rows_for(self, user_ids) -> sparse.csr_matrix:
+        """Rows re-ordered to user_ids; unknown users get an empty row."""
+        positions = self.users.get_many(user_ids)
+        known = np.flatnonzero(positions >= 0)
+        selector = sparse.csr_matrix(
+            (np.ones(len(known)), (known, positions[known])),
+            shape=(len(positions), self.matrix.shape[0]),
+        )
+        return (selector @ self.matrix).tocsr()
+
+    def with_rows(self, rows):
+        """
+        New matrix with the quantities of rows (user_id, product_id, qty, ...)
+        added. Existing positions are kept and new ids appended, so snapshots
+        already handed out stay valid.
+        """
+        users, products = self.users.copy(), self.products.copy()
+        user_idx = users.add_many(row["user_id"] for row in rows)
+        product_idx = products.add_many(row["product_id"] for row in rows)
+        qty = np.fromiter((row["qty"] for row in rows), dtype=np.float64, count=len(rows))
+
+        shape = (len(users), len(products))
+        base = self.matrix.tocoo()
+        matrix = sparse.csr_matrix(
+            (
+                np.concatenate([base.data, qty]),
+                (np.concatenate([base.row, user_idx]), np.concatenate([base.col, product_idx])),
+            ),
+            shape=shape,
+        )
+        watermarks = [row["last_order"] for row in rows]
+        if self.watermark is not None:
+            watermarks.append(self.watermark)
+        return InteractionMatrix(users, products, matrix, max(watermarks, default=None))
+
+
+async def fetch_interaction_rows(conn, since=None):
+    """Per (user, product) quantities, optionally only from orders after since."""
+    if since is None:
+        return await conn.fetch(INTERACTIONS_QUERY.format(and_where=""))
+    return await conn.fetch(
+        INTERACTIONS_QUERY.format(and_where="\n    AND o.created_at > $1"), since
+    )
+
+
+async def load_interactions(conn) -> InteractionMatrix:
+    empty = InteractionMatrix(IdIndex(), IdIndex(), sparse.csr_matrix((0, 0)))
+    rows = await fetch_interaction_rows(conn)
+    return await asyncio.to_thread(empty.with_rows, rows)
+
+
+class InteractionStore:
+    """
+    Process-wide resident InteractionMatrix shared by the collaborative
+    recommenders. Requests read the current snapshot; new orders are folded
+    in from an orders.created_at watermark and a periodic full reload picks
+    up products that left the APPROVED status. Once loaded, a stale snapshot
+    is still served while one background task refreshes it.
+    """
+
+    def __init__(self, pool, refresh_interval=60, full_rebuild_interval=86400):
+        self.pool = pool
+        self.refresh_interval = refresh_interval
+        self.full_rebuild_interval = full_rebuild_interval
+        self.current = None
+        self.last_refresh_at = None
+        self.last_full_rebuild_at = None
+        self.last_refresh_seconds = None
+        self._lock = asyncio.Lock()
+        self._revalidation = None
+
+    async def get(self) -> InteractionMatrix:
+        """
+        Current snapshot. Only the first call waits for the load; later ones
+        return at once and start a background refresh when it is stale.
+        """
+        if self.current is None:
+            return await self.refresh()
+        if self._is_stale() and self._revalidation is None:
+            self._revalidation = asyncio.create_task(self._revalidate())
+            self._revalidation.add_done_callback(self._revalidated)
+        return self.current
+
+    async def refresh(self, full=False) -> InteractionMatrix:
+        async with self._lock:
+            await self._update(full=full or self.current is None)
+        return self.current
+
+    async def _revalidate(self):
+        async with self._lock:
+            # A refresh() may have run while we waited on the lock.
+            if self._is_stale():
+                await self._update(full=self._needs_full_rebuild())
+
+    def _revalidated(self, task):
+        self._revalidation = None
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background interactions refresh failed: {task.exception()!r}")
+
+    async def _update(self, full):
+        start = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            if full or self.current.watermark is None:
+                self.current = await load_interactions(conn)
+                self.last_full_rebuild_at = time.time()
+            else:
+                rows = await fetch_interaction_rows(conn, since=self.current.watermark)
+                if rows:
+                    self.current = await asyncio.to_thread(self.current.with_rows, rows)
+        self.last_refresh_at = time.time()
+        self.last_refresh_seconds = time.perf_counter() - start
+
+    def _needs_full_rebuild(self):
+        return (
+            self.last_full_rebuild_at is None
+            or time.time() - self.last_full_rebuild_at >= self.full_rebuild_interval
+        )
+
+    def _is_stale(self):
+        return (
+            time.time() - self.last_refresh_at >= self.refresh_interval
+            or self._needs_full_rebuild()
+        )
+
+    def stats(self):
+        if self.current is None:
+            return {"loaded": False}
+        now = time.time()
+        return {
+            "loaded": True,
+            "users": len(self.current.users),
+            "products": len(self.current.products),
+            "interactions": int(self.current.matrix.nnz),
+            "watermark": (
+                self.current.watermark.isoformat() if self.current.watermark else None
+            ),
+            "staleness_seconds": now - self.last_refresh_at,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "since_full_rebuild_seconds": now - self.last_full_rebuild_at,
+        }
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+
+JOBS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS recommendation_jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        params JSONB NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL,
+        progress DOUBLE PRECISION NOT NULL DEFAULT 0,
+        stage TEXT,
+        error TEXT,
+        result JSONB,
+        created_at TIMESTAMPTZ NOT NULL,
+        started_at TIMESTAMPTZ,
+        finished_at TIMESTAMPTZ
+    );
+    CREATE INDEX IF NOT EXISTS recommendation_jobs_kind_status_idx
+        ON recommendation_jobs (kind, status);
+"""
+
+INSERT_JOB = """
+    INSERT INTO recommendation_jobs (job_id, kind, params, status, created_at)
+    VALUES ($1, $2, $3::jsonb, $4, $5);
+"""
+
+UPDATE_JOB = """
+    UPDATE recommendation_jobs
+    SET status = $2, progress = $3, stage = $4, error = $5, result = $6::jsonb,
+        started_at = $7, finished_at = $8
+    WHERE job_id = $1;
+"""
+
+SELECT_JOB = "SELECT * FROM recommendation_jobs WHERE job_id = $1;"
+
+SELECT_ACTIVE_JOB = """
+    SELECT * FROM recommendation_jobs
+    WHERE kind = $1 AND status IN ('queued', 'running')
+    ORDER BY created_at DESC
+    LIMIT 1;
+"""
+
+LIST_JOBS = "SELECT * FROM recommendation_jobs ORDER BY created_at DESC LIMIT $1;"
+
+# Rows of a kind still marked active while nobody holds its lock were left
+# behind by a worker that exited mid-job.
+ABANDON_JOBS = """
+    UPDATE recommendation_jobs
+    SET status = 'failed', error = 'worker exited before the job finished',
+        finished_at = now()
+    WHERE kind = $1 AND status IN ('queued', 'running');
+"""
+
+TRIM_JOBS = """
+    DELETE FROM recommendation_jobs
+    WHERE finished_at IS NOT NULL AND job_id NOT IN (
+        SELECT job_id FROM recommendation_jobs
+        WHERE finished_at IS NOT NULL
+        ORDER BY finished_at DESC
+        LIMIT $1
+    );
+"""
+
+
+class Job:
+    """One background run of a rebuild, as reported by GET /jobs/{id}."""
+
+    def __init__(self, kind, params=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = "queued"
+        self.progress = 0.0
+        self.stage = None
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Job as recorded in recommendation_jobs, possibly by another worker."""
+        job = cls(row["kind"], json.loads(row["params"]))
+        job.id = row["job_id"]
+        job.status = row["status"]
+        job.progress = row["progress"]
+        job.stage = row["stage"]
+        job.error = row["error"]
+        job.result = json.loads(row["result"]) if row["result"] is not None else None
+        job.created_at = row["created_at"].timestamp()
+        job.started_at = _timestamp(row["started_at"])
+        job.finished_at = _timestamp(row["finished_at"])
+        return job
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def report(self, progress, stage=None):
+        """Progress callback handed to the job function: fraction in [0, 1]."""
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if stage is not None:
+            self.stage = stage
+
+    def to_dict(self):
+        now = time.time()
+        started = self.started_at or now
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "stage": self.stage,
+            "error": self.error,
+            "result": self.result,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+            "queued_seconds": started - self.created_at,
+            "run_seconds": (
+                (self.finished_at or now) - self.started_at if self.started_at else None
+            ),
+        }
+
+
+class JobRunner:
+    """
+    Runs rebuild jobs as asyncio tasks off the request path. Job records live
+    in the recommendation_jobs table, so any uvicorn worker can answer
+    GET /jobs/{id} for a job another worker started.
+
+    - a kind runs in at most one worker at a time: the submitting worker
+      holds pg_try_advisory_lock(hashtext('job:' || kind)) on a dedicated
+      connection until the job finishes, and submitting a kind that is
+      already queued or running anywhere returns that job instead;
+    - at most max_concurrency jobs run at once per worker, the rest wait queued;
+    - the last history_size finished jobs are kept for lookups.
+    """
+
+    def __init__(
+        self, pool, connect, max_concurrency=1, history_size=100, flush_interval=1.0
+    ):
+        self.pool = pool
+        self.history_size = history_size
+        self.flush_interval = flush_interval
+        self._connect = connect
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._submit_lock = asyncio.Lock()
+        self._jobs = {}
+        self._lock_connections = {}
+
+    async def start(self):
+        """Create the jobs table; serialised so workers starting together don't race."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext('recommendation_jobs'))"
+                )
+                await conn.execute(JOBS_TABLE_DDL)
+
+    async def submit(self, kind, run, **params):
+        """
+        Queue run(job) under kind. Returns (job, created) where created is
+        False when an active job of the same kind was returned instead.
+        """
+        async with self._submit_lock:
+            lock_connection = await self._connect()
+            try:
+                locked = await lock_connection.fetchval(
+                    "SELECT pg_try_advisory_lock(hashtext($1))", f"job:{kind}"
+                )
+                if locked:
+                    job = Job(kind, params)
+                    await lock_connection.execute(ABANDON_JOBS, kind)
+                    await lock_connection.execute(
+                        INSERT_JOB,
+                        job.id,
+                        kind,
+                        json.dumps(params),
+                        job.status,
+                        _datetime(job.created_at),
+                    )
+            except BaseException:
+                await lock_connection.close()
+                raise
+
+            if not locked:
+                await lock_connection.close()
+                return await self._active(kind), False
+
+            self._jobs[job.id] = job
+            self._lock_connections[job.id] = lock_connection
+            job.task = asyncio.create_task(self._run(job, run))
+            return job, True
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        row = await self.pool.fetchrow(SELECT_JOB, job_id)
+        return Job.from_row(row) if row is not None else None
+
+    async def list(self):
+        rows = await self.pool.fetch(LIST_JOBS, self.history_size)
+        # Jobs running here report fresher progress than their last flush.
+        return [self._jobs.get(row["job_id"]) or Job.from_row(row) for row in rows]
+
+    async def _active(self, kind, attempts=20, delay=0.05):
+        # The lock holder inserts its row right after locking; wait out that gap.
+        for _ in range(attempts):
+            row = await self.pool.fetchrow(SELECT_ACTIVE_JOB, kind)
+            if row is not None:
+                return Job.from_row(row)
+            await asyncio.sleep(delay)
+        raise RuntimeError(f"Job {kind} is locked by another worker but has no record")
+
+    async def _run(self, job, run):
+        flusher = None
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.started_at = time.time()
+                await self._save(job)
+                flusher = asyncio.create_task(self._flush_progress(job))
+                job.result = await run(job)
+            job.status = "succeeded"
+            job.report(1.0)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"Job {job.kind} {job.id} failed: {e!r}")
+        finally:
+            job.finished_at = time.time()
+            if flusher is not None:
+                flusher.cancel()
+            await self._finish(job)
+
+    async def _flush_progress(self, job):
+        reported = None
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if (job.progress, job.stage) != reported:
+                reported = (job.progress, job.stage)
+                try:
+                    await self._save(job)
+                except Exception as e:
+                    print(f"Job {job.kind} {job.id} progress not saved: {e!r}")
+
+    async def _save(self, job):
+        await self.pool.execute(
+            UPDATE_JOB,
+            job.id,
+            job.status,
+            job.progress,
+            job.stage,
+            job.error,
+            json.dumps(job.result, default=str) if job.result is not None else None,
+            _datetime(job.started_at),
+            _datetime(job.finished_at),
+        )
+
+    async def _finish(self, job):
+        """Record the final state, then release the kind's lock."""
+        try:
+            await self._save(job)
+            await self.pool.execute(TRIM_JOBS, self.history_size)
+        except Exception as e:
+            print(f"Job {job.kind} {job.id} final state not saved: {e!r}")
+        finally:
+            self._jobs.pop(job.id, None)
+            # Closing the session drops its advisory lock.
+            await self._lock_connections.pop(job.id).close()
+
+    async def shutdown(self):
+        """Cancel jobs still queued or running in this worker."""
+        jobs = list(self._jobs.values())
+        for job in jobs:
+            job.task.cancel()
+        await asyncio.gather(*(job.task for job in jobs), return_exceptions=True)
+        for job in jobs:
+            # Tasks cancelled before their first step never reach _run.
+            if not job.done:
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                await self._finish(job)
+
+
+def no_progress(progress, stage=None):
+    """Default progress callback for rebuilds run outside a job."""
+
+
+def job_accepted(job, created):
+    """Response body of an endpoint that queued (or joined) a job."""
+    return {
+        "status": job.status,
+        "job_id": job.id,
+        "kind": job.kind,
+        "deduplicated": not created,
+    }
+
+
+def _datetime(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _timestamp(value):
+    return value.timestamp() if value is not None else None
+
+
+def _isoformat(timestamp):
+    if timestamp is None:
+        return None
+    return _datetime(timestamp).isoformat()
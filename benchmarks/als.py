@@ -0,0 +1,50 @@
+"""
+ALS training time per iteration and per-user serving latency on synthetic
+implicit feedback.
+
+    python -m benchmarks.als --users 100000 --products 20000 --factors 64
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.features.als.factorization import top_items, train_als
+from benchmarks.user_cf_batch import synthetic_purchases
+
+
+def main(n_users, n_products, factors, iterations, queries):
+    purchases = synthetic_purchases(n_users, n_products)
+
+    start = time.perf_counter()
+    user_factors, item_factors = train_als(
+        purchases, factors=factors, iterations=iterations
+    )
+    train_s = time.perf_counter() - start
+    print(
+        f"train: {train_s:.1f}s for {iterations} iterations "
+        f"({train_s / iterations:.2f}s/iteration, {n_users} users x {n_products} products)"
+    )
+    factor_mb = (user_factors.nbytes + item_factors.nbytes) / 2**20
+    print(f"factors: {factor_mb:.1f} MiB float32")
+
+    rng = np.random.default_rng(4)
+    targets = rng.choice(n_users, size=queries, replace=False)
+    start = time.perf_counter()
+    for row in targets:
+        bought = purchases.indices[purchases.indptr[row] : purchases.indptr[row + 1]]
+        top_items(user_factors[row], item_factors, bought, 5)
+    serve_ms = (time.perf_counter() - start) / queries * 1000
+    print(f"serve: {serve_ms:.3f} ms/user")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--factors", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.users, args.products, args.factors, args.iterations, args.queries)
@@ -0,0 +1,90 @@
+"""
+Recall@k against the exact Flat index, queries per second, build time and
+index size of each content index type, on synthetic clustered embeddings
+or on real ones (an .npy matrix or the stored index of a model).
+
+    python -m benchmarks.content_ann --products 200000 --dim 384 --k 5
+    python -m benchmarks.content_ann --embeddings embeddings.npy
+    python -m benchmarks.content_ann --store /models/content --model all-MiniLM-L6-v2
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app.features.content_based.ann import build_index, set_search_params
+from app.features.content_based.store import ContentIndexStore
+
+
+def synthetic_embeddings(n_products, dim, n_topics=1000, seed=0):
+    # Products scattered around topic centres, like text embeddings of a
+    # catalog with many near-duplicates per category.
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_topics, dim), dtype=np.float32)
+    topics = rng.integers(n_topics, size=n_products)
+    embeddings = centres[topics] + 0.6 * rng.standard_normal((n_products, dim), dtype=np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def recall_and_qps(index, queries, exact, k):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    qps = len(queries) / (time.perf_counter() - start)
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found.tolist(), exact.tolist()))
+    return hits / exact.size, qps
+
+
+def main(embeddings, k, n_queries, pq_m):
+    n_products, dim = embeddings.shape
+    keys = np.arange(n_products, dtype=np.int64)
+    rows = np.random.default_rng(3).choice(n_products, size=n_queries, replace=False)
+    queries = np.ascontiguousarray(embeddings[np.sort(rows)], dtype=np.float32)
+    print(f"{n_products} products x {dim}, {n_queries} queries, {faiss.omp_get_max_threads()} OpenMP threads")
+
+    configs = [("flat", {}, {})]
+    configs += [("hnsw", {}, dict(ef_search=ef)) for ef in (16, 64, 256)]
+    configs += [("ivf_flat", {}, dict(nprobe=nprobe)) for nprobe in (4, 16, 64)]
+    configs += [("ivf_pq", dict(pq_m=pq_m), dict(nprobe=nprobe)) for nprobe in (4, 16, 64)]
+
+    print(f"{'index':<26} {'build s':>8} {'MB':>8} {'recall@' + str(k):>9} {'QPS':>9}")
+    built, exact = {}, None
+    for kind, options, search in configs:
+        build_s = 0.0
+        if kind not in built:
+            start = time.perf_counter()
+            built[kind] = build_index(embeddings, keys, kind=kind, **options)
+            build_s = time.perf_counter() - start
+        index = set_search_params(built[kind], **search)
+        if exact is None:
+            _, exact = index.search(queries, k)
+        recall, qps = recall_and_qps(index, queries, exact, k)
+        size_mb = faiss.serialize_index(index).nbytes / 2**20
+        label = f"{kind} " + " ".join(f"{key}={val}" for key, val in search.items())
+        build = f"{build_s:.1f}" if build_s else "-"
+        print(f"{label:<26} {build:>8} {size_mb:>8.1f} {recall:>9.3f} {qps:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--embeddings", help=".npy matrix of L2-normalized embeddings")
+    parser.add_argument("--store", help="content store root (settings.model_dir/content)")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--pq-m", type=int, default=48)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        embeddings = np.load(args.embeddings, mmap_mode="r")
+    elif args.store:
+        artifacts = ContentIndexStore(args.store, args.model).current()
+        if artifacts is None:
+            parser.error(f"no stored content index for {args.model} in {args.store}")
+        embeddings = artifacts.embeddings
+    else:
+        embeddings = synthetic_embeddings(args.products, args.dim)
+    main(embeddings, args.k, args.queries, args.pq_m)
@@ -0,0 +1,87 @@
+"""
+Catalog encoding for the initial content index build: padding waste of
+pool chunks taken in catalog order (as encode_multi_process splits them)
+against length-sorted chunks, and texts/sec of the in-process encoder
+against encode_parallel pools. The throughput part needs
+sentence-transformers; the padding part only counts words.
+
+    python -m benchmarks.content_encoding --products 50000 --workers 1 2 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.features.content_based.encoding import encode_parallel, length_sorted_chunks
+
+
+def synthetic_texts(n_products, seed=0):
+    # Names and brands are short; descriptions range from empty to long.
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    lengths = np.minimum(rng.lognormal(3.5, 1.0, size=n_products).astype(int), 400)
+    return [
+        f"product {i} brand {i % 300} " + " ".join(rng.choice(vocabulary, size=length))
+        for i, length in enumerate(lengths)
+    ]
+
+
+def padding_waste(lengths, chunks, batch_size, max_tokens=256):
+    # encode() sorts each chunk by length and pads every batch to its longest text.
+    padded = real = 0
+    for chunk in chunks:
+        chunk_lengths = np.sort(np.minimum(lengths[chunk], max_tokens))[::-1]
+        for start in range(0, len(chunk_lengths), batch_size):
+            batch = chunk_lengths[start : start + batch_size]
+            padded += batch[0] * len(batch)
+            real += batch.sum()
+    return 1 - real / padded
+
+
+def main(n_products, workers, model_name, batch_size, chunk_size):
+    texts = synthetic_texts(n_products)
+    lengths = np.array([len(text.split()) for text in texts])
+    in_order = [
+        np.arange(start, min(start + chunk_size, n_products))
+        for start in range(0, n_products, chunk_size)
+    ]
+    print(f"{n_products} texts, {lengths.mean():.0f} words on average, batch {batch_size}")
+    print(f"padding waste, catalog-order chunks: {padding_waste(lengths, in_order, batch_size):.1%}")
+    print(
+        "padding waste, length-sorted chunks: "
+        f"{padding_waste(lengths, length_sorted_chunks(texts, chunk_size), batch_size):.1%}"
+    )
+
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("sentence-transformers not installed: skipping throughput")
+        return
+
+    for n_workers in workers:
+        start = time.perf_counter()
+        if n_workers == 1:
+            SentenceTransformer(model_name, device="cpu").encode(
+                texts, batch_size=batch_size, show_progress_bar=False
+            )
+        else:
+            encode_parallel(
+                model_name, texts, n_workers, batch_size=batch_size, chunk_size=chunk_size
+            )
+        seconds = time.perf_counter() - start
+        print(
+            f"{n_workers} worker(s): {seconds:>7.1f} s, {n_products / seconds:>7.0f} texts/sec "
+            "(model load included)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    args = parser.parse_args()
+    main(args.products, args.workers, args.model, args.batch_size, args.chunk_size)
@@ -0,0 +1,82 @@
+"""
+Size of a stored content index version (what every worker maps) with
+float32 embeddings next to the index against float16 / int8 scalar
+quantized codes as the only copy, and the overlap of the top-k similar
+products each returns with the float32 ones.
+
+    python -m benchmarks.content_precision --products 200000 --dim 384 --k 5
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.features.content_based.ann import index_options
+from app.features.content_based.knn import top_neighbours
+from app.features.content_based.store import ContentArtifacts, ContentIndexStore
+from benchmarks.content_ann import synthetic_embeddings
+
+
+def stored_mb(path):
+    return sum(
+        os.path.getsize(os.path.join(path, name))
+        for name in ("embeddings.npy", "index.faiss")
+        if os.path.exists(os.path.join(path, name))
+    ) / 2**20
+
+
+def neighbour_sets(artifacts, rows, k):
+    sources, targets = top_neighbours(artifacts, rows, k)
+    found = {row: set() for row in rows.tolist()}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        found[source].add(target)
+    return found
+
+
+def main(n_products, dim, k, n_queries, kind):
+    embeddings = synthetic_embeddings(n_products, dim)
+    product_ids = np.array([f"{i:036d}" for i in range(n_products)])
+    hashes = np.array([f"{i:040x}" for i in range(n_products)])
+    rows = np.sort(np.random.default_rng(3).choice(n_products, size=n_queries, replace=False))
+    print(f"{n_products} products x {dim}, {kind} index, top {k} of {n_queries} products")
+
+    print(f"{'dtype':<8} {'build s':>8} {'MB':>8} {'B/product':>10} {'search s':>9} {'overlap@' + str(k):>10}")
+    exact = None
+    with tempfile.TemporaryDirectory() as root:
+        for dtype in ("float32", "float16", "int8"):
+            options = index_options(kind=kind, embedding_dtype=dtype)
+            store = ContentIndexStore(root, f"bench-{dtype}")
+            start = time.perf_counter()
+            artifacts = store.save(
+                ContentArtifacts.empty(dim, options).updated(
+                    [], product_ids, hashes, embeddings
+                )
+            )
+            build_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = neighbour_sets(artifacts, rows, k)
+            search_s = time.perf_counter() - start
+            exact = exact or found
+            overlap = np.mean([len(found[row] & exact[row]) / k for row in exact])
+
+            size_mb = stored_mb(artifacts.path)
+            per_product = size_mb * 2**20 / n_products
+            print(
+                f"{dtype:<8} {build_s:>8.1f} {size_mb:>8.1f} {per_product:>10.0f} "
+                f"{search_s:>9.2f} {overlap:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--kind", default="flat", choices=["flat", "hnsw", "ivf_flat"])
+    args = parser.parse_args()
+    main(args.products, args.dim, args.k, args.queries, args.kind)
@@ -0,0 +1,85 @@
+"""
+Per-request overhead of ContentRecommender.recommend outside the FAISS
+search: the old DataFrame path (membership test, boolean-mask row lookup,
+iloc + to_dict) against the IdIndex lookup and key -> row mapping, plus
+the memory held for serving by each.
+
+    python -m benchmarks.content_recommend --products 200000 --queries 2000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.features.content_based.store import ContentArtifacts
+from app.shares.id_index import IdIndex
+
+
+def dataframe_path(products, product_id, hits):
+    if product_id not in products["product_id"].values:
+        return []
+    idx = products.index[products["product_id"] == product_id][0]
+    rec_indices = [i for i in hits if i != idx][:5]
+    return products.iloc[rec_indices][["product_id"]].to_dict(orient="records")
+
+
+def index_path(ids, artifacts, product_id, keys):
+    row = ids.get(product_id)
+    if row is None:
+        return []
+    rows = artifacts.rows_for_keys(keys)
+    rows = rows[(rows >= 0) & (rows != row)][:5]
+    return [{"product_id": ids[r]} for r in rows.tolist()]
+
+
+def per_call_us(fn, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main(n_products, n_queries):
+    rng = np.random.default_rng(0)
+    product_ids = np.array([f"{i:08d}-0000-0000-0000-000000000000" for i in range(n_products)])
+    products = pd.DataFrame(
+        {
+            "product_id": product_ids,
+            "name": [f"product {i}" for i in range(n_products)],
+            "brand": "brand",
+            "description": ["lorem ipsum dolor sit amet " * 20] * n_products,
+        }
+    )
+    artifacts = ContentArtifacts(
+        product_ids, None, np.arange(n_products, dtype=np.int64), None, None
+    )
+    tracemalloc.start()
+    ids = IdIndex(product_ids.tolist())
+    ids_mb = tracemalloc.get_traced_memory()[0] / 2**20
+    tracemalloc.stop()
+
+    targets = rng.integers(0, n_products, size=n_queries)
+    hits = rng.integers(0, n_products, size=(n_queries, 6))
+    old = per_call_us(
+        dataframe_path, [(products, product_ids[t], h) for t, h in zip(targets, hits)]
+    )
+    new = per_call_us(
+        index_path, [(ids, artifacts, product_ids[t], h) for t, h in zip(targets, hits)]
+    )
+    print(f"dataframe path: {old:>9.1f} us/request")
+    print(f"IdIndex path:   {new:>9.1f} us/request ({old / new:.0f}x)")
+    print(
+        f"serving metadata: DataFrame {products.memory_usage(deep=True).sum() / 2**20:.0f} MB, "
+        f"id array {product_ids.nbytes / 2**20:.0f} MB + IdIndex {ids_mb:.0f} MB"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.products, args.queries)
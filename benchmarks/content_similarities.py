@@ -0,0 +1,71 @@
+"""
+Whole-catalog similar-products pass: one FAISS search per product (the
+old update_similar_products_in_db loop) against chunked searches over the
+embedding matrix, with peak traced memory of the chunked pass and a check
+that both produce the same pairs.
+
+    python -m benchmarks.content_similarities --products 50000 --dim 384
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import faiss
+import numpy as np
+
+from app.features.content_based.knn import top_neighbours
+from app.features.content_based.store import ContentArtifacts
+
+
+def per_product(artifacts, top_n, limit):
+    pairs = []
+    for row in range(limit):
+        sources, targets = top_neighbours(artifacts, np.array([row]), top_n)
+        pairs.extend(zip(sources.tolist(), targets.tolist()))
+    return pairs
+
+
+def chunked(artifacts, top_n, chunk_size, limit):
+    pairs = []
+    for start in range(0, limit, chunk_size):
+        rows = np.arange(start, min(start + chunk_size, limit))
+        sources, targets = top_neighbours(artifacts, rows, top_n)
+        pairs.extend(zip(sources.tolist(), targets.tolist()))
+    return pairs
+
+
+def main(n_products, dim, top_n, chunk_size, sample):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n_products, dim), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    artifacts = ContentArtifacts.empty(dim).updated(
+        [], np.arange(n_products).astype(str), np.zeros(n_products, dtype="U40"), embeddings
+    )
+    print(f"{n_products} products x {dim}, top {top_n}, {faiss.omp_get_max_threads()} OpenMP threads")
+
+    start = time.perf_counter()
+    loop_pairs = per_product(artifacts, top_n, sample)
+    loop_s = (time.perf_counter() - start) / sample * n_products
+    print(f"per-product search: {loop_s:>8.1f} s (extrapolated from {sample} products)")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    pairs = chunked(artifacts, top_n, chunk_size, n_products)
+    chunk_s = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    print(f"chunked search:     {chunk_s:>8.1f} s ({chunk_size} per chunk), {loop_s / chunk_s:.1f}x")
+    print(f"peak traced memory: {peak:.0f} MB (includes the {len(pairs)} collected pairs)")
+    print(f"same pairs: {pairs[: len(loop_pairs)] == loop_pairs}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--sample", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.products, args.dim, args.top_n, args.chunk_size, args.sample)
@@ -0,0 +1,78 @@
+"""
+Startup cost of opening the stored content index (memory-mapped
+embeddings + FAISS index) against rebuilding the index from an in-memory
+embedding matrix, the resident memory each adds, and the cost of an
+incremental update (edit/delist/add) applied through IndexIDMap2. Encoding
+time is not included; with SentenceTransformer it dominates a rebuild.
+
+    python -m benchmarks.content_store --products 200000 --dim 384
+"""
+
+import argparse
+import resource
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from app.features.content_based.store import ContentArtifacts, ContentIndexStore
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(n_products, dim, changed):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n_products, dim), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    product_ids = np.array([f"{i:036d}" for i in range(n_products)])
+    hashes = np.array([f"{i:040x}" for i in range(n_products)])
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ContentIndexStore(root, "bench-model")
+        store.save(
+            ContentArtifacts.empty(dim).updated([], product_ids, hashes, embeddings)
+        )
+
+        before = rss_mb()
+        start = time.perf_counter()
+        artifacts = store.current()
+        opened = time.perf_counter() - start
+        print(f"open stored:   {opened * 1000:>8.1f} ms, +{rss_mb() - before:.0f} MB peak RSS")
+
+        queries = embeddings[:100]
+        start = time.perf_counter()
+        artifacts.index.search(queries, 6)
+        print(f"100 searches on mapped index: {time.perf_counter() - start:.2f}s")
+
+        before = rss_mb()
+        start = time.perf_counter()
+        rebuilt = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        rebuilt.add_with_ids(np.ascontiguousarray(artifacts.embeddings), artifacts.keys)
+        print(
+            f"rebuild index: {(time.perf_counter() - start) * 1000:>8.1f} ms, "
+            f"+{rss_mb() - before:.0f} MB peak RSS"
+        )
+
+        drop = rng.choice(n_products, size=changed, replace=False)
+        start = time.perf_counter()
+        updated = artifacts.updated(
+            drop, product_ids[drop], hashes[drop], embeddings[drop]
+        )
+        applied = time.perf_counter() - start
+        store.save(updated)
+        print(
+            f"update {changed} products: {applied * 1000:.1f} ms in memory, "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms with the new version saved"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--changed", type=int, default=100)
+    args = parser.parse_args()
+    main(args.products, args.dim, args.changed)
@@ -0,0 +1,76 @@
+"""
+Peak traced memory of loading orders as one list of product-id lists
+(get_transactions + encode_baskets) against the chunked BasketEncoder that
+the server-side cursor feeds, and a check that both mine the same rules.
+
+    python -m benchmarks.fpgrowth_loader --orders 1000000 --products 50000
+"""
+
+import argparse
+import time
+
+from app.features.FPGrowth.loader import encode_chunks
+from app.features.FPGrowth.parallel import mine_parallel_basket_rules
+from app.features.FPGrowth.sparse_miner import (
+    encode_baskets,
+    mine_basket_rules,
+    mine_sparse_rules,
+)
+from benchmarks.fpgrowth_mining import measure, rule_set, synthetic_transactions
+
+
+def chunks(n_orders, n_products, chunk_size):
+    """Cursor-sized batches of synthetic baskets, generated lazily."""
+    for seed, start in enumerate(range(0, n_orders, chunk_size)):
+        yield synthetic_transactions(min(chunk_size, n_orders - start), n_products, seed)
+
+
+def materialized(n_orders, n_products, chunk_size):
+    transactions = [
+        basket for chunk in chunks(n_orders, n_products, chunk_size) for basket in chunk
+    ]
+    encode_baskets(transactions)
+    return transactions
+
+
+def main(n_orders, n_products, chunk_size, min_support, min_confidence):
+    print(f"{'loader':<14} {'seconds':>9} {'peak MB':>9}")
+    transactions, seconds, peak = measure(materialized, n_orders, n_products, chunk_size)
+    print(f"{'materialized':<14} {seconds:>9.2f} {peak:>9.1f}")
+
+    baskets, seconds, peak = measure(
+        lambda: encode_chunks(chunks(n_orders, n_products, chunk_size))
+    )
+    print(f"{'streamed':<14} {seconds:>9.2f} {peak:>9.1f}")
+    print(
+        f"{baskets.n_transactions} orders, {baskets.matrix.shape[0]} kept "
+        f"with 2+ products, {len(baskets.items)} products"
+    )
+
+    start = time.perf_counter()
+    expected = rule_set(mine_sparse_rules(transactions, min_support, min_confidence))
+    streamed = rule_set(mine_basket_rules(baskets, min_support, min_confidence))
+    parallel = rule_set(
+        mine_parallel_basket_rules(baskets, min_support, min_confidence, workers=2)
+    )
+    print(
+        f"same rules: {streamed == expected}, parallel: {parallel == expected} "
+        f"({len(expected)} rules, {time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--min-support", type=float, default=0.0005)
+    parser.add_argument("--min-confidence", type=float, default=0.2)
+    args = parser.parse_args()
+    main(
+        args.orders,
+        args.products,
+        args.chunk_size,
+        args.min_support,
+        args.min_confidence,
+    )
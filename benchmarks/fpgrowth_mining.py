@@ -0,0 +1,89 @@
+"""
+Time and peak traced memory of the mlxtend path (TransactionEncoder +
+fpgrowth + association_rules) against the sparse integer-coded miner on
+synthetic baskets, and a check that both produce the same rules.
+
+    python -m benchmarks.fpgrowth_mining --orders 200000 --products 20000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import association_rules, fpgrowth
+from mlxtend.preprocessing import TransactionEncoder
+
+from app.features.FPGrowth.sparse_miner import mine_sparse_rules
+
+
+def synthetic_transactions(n_orders, n_products, seed=0):
+    """Baskets of 1-8 products with Zipf-distributed popularity."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 9, size=n_orders)
+    picks = (rng.zipf(1.3, size=sizes.sum()) - 1) % n_products
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    ids = picks.astype(str)
+    return [ids[bounds[i] : bounds[i + 1]].tolist() for i in range(n_orders)]
+
+
+def mlxtend_rules(transactions, min_support, min_confidence):
+    te = TransactionEncoder()
+    df = pd.DataFrame(te.fit(transactions).transform(transactions), columns=te.columns_)
+    itemsets = fpgrowth(df, min_support=min_support, use_colnames=True)
+    return association_rules(itemsets, metric="confidence", min_threshold=min_confidence)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def rule_set(rules):
+    return {
+        (a, c, round(conf, 9))
+        for a, c, conf in rules[["antecedents", "consequents", "confidence"]].itertuples(
+            index=False
+        )
+    }
+
+
+def main(n_orders, n_products, min_support, min_confidence, skip_mlxtend):
+    transactions = synthetic_transactions(n_orders, n_products)
+    print(f"{'engine':<10} {'seconds':>9} {'peak MB':>9} {'rules':>7}")
+
+    sparse_rules, seconds, peak = measure(
+        mine_sparse_rules, transactions, min_support, min_confidence
+    )
+    print(f"{'sparse':<10} {seconds:>9.2f} {peak:>9.1f} {len(sparse_rules):>7}")
+    if skip_mlxtend:
+        return
+
+    dense_rules, seconds, peak = measure(
+        mlxtend_rules, transactions, min_support, min_confidence
+    )
+    print(f"{'mlxtend':<10} {seconds:>9.2f} {peak:>9.1f} {len(dense_rules):>7}")
+    print(f"same rules: {rule_set(sparse_rules) == rule_set(dense_rules)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--min-support", type=float, default=0.001)
+    parser.add_argument("--min-confidence", type=float, default=0.2)
+    parser.add_argument("--skip-mlxtend", action="store_true")
+    args = parser.parse_args()
+    main(
+        args.orders,
+        args.products,
+        args.min_support,
+        args.min_confidence,
+        args.skip_mlxtend,
+    )
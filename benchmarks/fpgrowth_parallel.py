@@ -0,0 +1,53 @@
+"""
+Scaling of the partitioned (PFP) itemset miner over 1/2/4/8 worker
+processes on synthetic baskets. 1 worker is the single-process miner.
+
+    python -m benchmarks.fpgrowth_parallel --orders 1000000 --products 50000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.features.FPGrowth.parallel import parallel_frequent_itemsets
+from app.features.FPGrowth.sparse_miner import encode_baskets, frequent_itemsets
+from benchmarks.fpgrowth_mining import synthetic_transactions
+
+
+def same_levels(a, b):
+    return len(a) == len(b) and all(
+        np.array_equal(sa, sb) and np.array_equal(ca, cb)
+        for (sa, ca), (sb, cb) in zip(a, b)
+    )
+
+
+def main(n_orders, n_products, min_support, workers):
+    _, baskets = encode_baskets(synthetic_transactions(n_orders, n_products))
+
+    start = time.perf_counter()
+    reference = frequent_itemsets(baskets, min_support)
+    base = time.perf_counter() - start
+    print(f"{'workers':>7} {'seconds':>9} {'speedup':>8} {'itemsets':>9}  same")
+    print(f"{1:>7} {base:>9.2f} {1:>8.2f} {sum(len(c) for _, c in reference):>9}  -")
+
+    for n in workers:
+        if n == 1:
+            continue
+        start = time.perf_counter()
+        levels = parallel_frequent_itemsets(baskets, min_support, n)
+        seconds = time.perf_counter() - start
+        print(
+            f"{n:>7} {seconds:>9.2f} {base / seconds:>8.2f} "
+            f"{sum(len(c) for _, c in levels):>9}  {same_levels(reference, levels)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--min-support", type=float, default=0.0005)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    main(args.orders, args.products, args.min_support, args.workers)
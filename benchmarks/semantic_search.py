@@ -0,0 +1,92 @@
+"""
+Per-query latency of semantic product search (ContentRecommender.search)
+past query encoding: unfiltered, with a brand filter (small subset, scored
+exactly) and with a price filter (large subset, prefiltered index search),
+for each content index type. With --model the MiniLM query encoding is
+timed as well (needs sentence-transformers).
+
+    python -m benchmarks.semantic_search --products 200000 --dim 384
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.features.content_based.ann import build_index, index_options, set_search_params
+from app.features.content_based.facets import ProductFacets
+from app.features.content_based.knn import search_rows
+from app.features.content_based.store import ContentArtifacts
+from benchmarks.content_ann import synthetic_embeddings
+
+
+def latencies_ms(artifacts, facets, queries, top_n, **filters):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        allowed = facets.rows(**filters)
+        search_rows(artifacts, query, top_n, allowed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, [50, 95])
+
+
+def main(n_products, dim, top_n, n_queries, model_name):
+    rng = np.random.default_rng(0)
+    embeddings = synthetic_embeddings(n_products, dim)
+    product_ids = np.array([f"{i:036d}" for i in range(n_products)])
+    products = pd.DataFrame(
+        {
+            "product_id": product_ids,
+            "name": [f"product {i}" for i in range(n_products)],
+            "brand": [f"brand {b}" for b in rng.integers(500, size=n_products)],
+            "min_price": rng.uniform(10_000, 50_000_000, size=n_products).round(-3),
+        }
+    )
+    facets = ProductFacets.from_products(products, product_ids)
+    queries = synthetic_embeddings(n_queries, dim, seed=1)
+    keys = np.arange(n_products, dtype=np.int64)
+    print(f"{n_products} products x {dim}, top {top_n}, {n_queries} queries")
+
+    if model_name:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+        texts = [f"áo thun nam size {i}" for i in range(n_queries)]
+        model.encode(texts[:1], show_progress_bar=False)
+        start = time.perf_counter()
+        for text in texts:
+            model.encode([text], show_progress_bar=False)
+        encode_ms = (time.perf_counter() - start) / n_queries * 1000
+        print(f"query encoding ({model_name}): {encode_ms:.1f} ms/query")
+
+    cases = [
+        ("no filter", {}),
+        ("brand", dict(brand="brand 7")),
+        ("price <= 5M", dict(max_price=5_000_000)),
+    ]
+    print(f"{'index':<10} {'filter':<14} {'p50 ms':>8} {'p95 ms':>8}")
+    for kind in ("flat", "hnsw", "ivf_flat"):
+        index = set_search_params(build_index(embeddings, keys, kind=kind))
+        artifacts = ContentArtifacts(
+            product_ids,
+            np.zeros(n_products, dtype="U40"),
+            keys,
+            embeddings,
+            index,
+            options=index_options(kind=kind),
+        )
+        for label, filters in cases:
+            p50, p95 = latencies_ms(artifacts, facets, queries, top_n, **filters)
+            print(f"{kind:<10} {label:<14} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--model", help="also time query encoding, e.g. all-MiniLM-L6-v2")
+    args = parser.parse_args()
+    main(args.products, args.dim, args.top_n, args.queries, args.model)
@@ -0,0 +1,53 @@
+"""
+Recall@k and query latency of the FAISS user index (HNSW / IVF) against the
+exact SimilarityEngine on synthetic user features.
+
+    python -m benchmarks.user_cf_ann --users 100000 --k 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.features.user_cf.ann import UserANNIndex
+from app.features.user_cf.similarity import SimilarityEngine
+from benchmarks.user_cf_similarity import synthetic_features
+
+
+def recall_and_latency(index, targets, exact, k):
+    start = time.perf_counter()
+    found = [index.top_k(t, k)[0] for t in targets]
+    latency_ms = (time.perf_counter() - start) / len(targets) * 1000
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found, exact))
+    return hits / (k * len(targets)), latency_ms
+
+
+def main(n_users, k, queries):
+    engine = SimilarityEngine(synthetic_features(n_users))
+    targets = np.random.default_rng(3).choice(n_users, size=queries, replace=False)
+
+    start = time.perf_counter()
+    exact = [engine.top_k(t, k)[0] for t in targets]
+    exact_ms = (time.perf_counter() - start) / queries * 1000
+    print(f"{'index':<22} {'build s':>8} {'recall@' + str(k):>9} {'ms/query':>9}")
+    print(f"{'exact':<22} {0:>8.1f} {1:>9.3f} {exact_ms:>9.3f}")
+
+    configs = [("hnsw", dict(ef_search=ef)) for ef in (16, 64, 256)]
+    configs += [("ivf", dict(nprobe=nprobe)) for nprobe in (4, 16, 64)]
+    for kind, options in configs:
+        start = time.perf_counter()
+        index = UserANNIndex.build(engine, kind=kind, **options)
+        build_s = time.perf_counter() - start
+        recall, latency = recall_and_latency(index, targets, exact, k)
+        label = f"{kind} " + " ".join(f"{key}={val}" for key, val in options.items())
+        print(f"{label:<22} {build_s:>8.1f} {recall:>9.3f} {latency:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.users, args.k, args.queries)
@@ -0,0 +1,59 @@
+"""
+Wall time and peak score-block memory of the blocked all-users UserCF job
+on synthetic data.
+
+    python -m benchmarks.user_cf_batch --users 10000 100000 --budget-mb 512
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+
+from app.features.user_cf.scoring import recommend_all
+from app.features.user_cf.similarity import SimilarityEngine
+from benchmarks.user_cf_similarity import synthetic_features
+
+
+def synthetic_purchases(n_users, n_products, seed=0):
+    rng = np.random.default_rng(seed)
+    return sparse.random(
+        n_users,
+        n_products,
+        density=min(1.0, 8 / n_products),
+        format="csr",
+        random_state=seed,
+        data_rvs=lambda size: rng.integers(1, 4, size).astype(np.float64),
+    )
+
+
+def main(sizes, n_products, budget_mb, top_n):
+    print(f"{'users':>8} {'block rows':>11} {'seconds':>9} {'users/s':>9}")
+    for n_users in sizes:
+        engine = SimilarityEngine(synthetic_features(n_users))
+        purchases = synthetic_purchases(n_users, n_products)
+        block_rows = max(1, int(budget_mb * 2**20 // (6 * 8 * n_users)))
+
+        start = time.perf_counter()
+        written = sum(
+            len(cols)
+            for _, cols in recommend_all(
+                engine, purchases, top_n=top_n, memory_budget_mb=budget_mb
+            )
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"{n_users:>8} {block_rows:>11} {elapsed:>9.1f} {n_users / elapsed:>9.0f}"
+            f"   ({written} suggestions)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--budget-mb", type=int, default=512)
+    parser.add_argument("--top-n", type=int, default=5)
+    args = parser.parse_args()
+    main(args.users, args.products, args.budget_mb, args.top_n)
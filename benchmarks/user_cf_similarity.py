@@ -0,0 +1,94 @@
+"""
+Per-pair pearsonr/cosine_similarity loop vs SimilarityEngine on synthetic
+user feature matrices.
+
+    python -m benchmarks.user_cf_similarity --users 10000 100000
+
+The legacy loop is timed on --legacy-sample users and extrapolated linearly;
+rankings of both paths are compared on that sample.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.stats import pearsonr
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.features.user_cf.similarity import SimilarityEngine
+
+
+def synthetic_features(n_users, n_categories=40, n_brands=400, seed=0):
+    rng = np.random.default_rng(seed)
+    orders = rng.poisson(3, n_users)
+    spent = orders * rng.gamma(2.0, 150.0, n_users)
+    qty = sparse.random(
+        n_users,
+        n_categories + n_brands,
+        density=0.02,
+        random_state=seed,
+        data_rvs=lambda size: rng.integers(1, 5, size),
+    )
+    head = sparse.csr_matrix(np.column_stack([orders, spent]).astype(np.float64))
+    return sparse.hstack([head, qty], format="csr")
+
+
+def legacy_top_k(matrix, target_row, k):
+    target = matrix[target_row].toarray().ravel()
+    others = [row for row in range(matrix.shape[0]) if row != target_row]
+    scored = []
+    for idx, row in enumerate(others):
+        v = matrix[row].toarray().ravel()
+        if np.std(target) == 0 or np.std(v) == 0:
+            p = 0.0
+        else:
+            p, _ = pearsonr(target, v)
+            p = 0.0 if np.isnan(p) else p
+        c = cosine_similarity([target], [v])[0][0]
+        scored.append((0.5 * p + 0.5 * c, idx))
+    scored.sort(reverse=True)
+    return [others[idx] for _, idx in scored[:k]]
+
+
+def main(sizes, k, legacy_sample, queries):
+    sample = synthetic_features(legacy_sample, seed=1)
+    engine = SimilarityEngine(sample)
+    rng = np.random.default_rng(2)
+    targets = rng.choice(legacy_sample, size=min(queries, legacy_sample), replace=False)
+
+    start = time.perf_counter()
+    legacy = [legacy_top_k(sample, t, k) for t in targets]
+    legacy_per_user = (time.perf_counter() - start) / len(targets) / legacy_sample
+    matches = sum(
+        list(engine.top_k(t, k)[0]) == expected for t, expected in zip(targets, legacy)
+    )
+    print(f"rankings identical on {matches}/{len(targets)} sampled targets")
+
+    print(f"{'users':>8} {'legacy s/query':>15} {'engine s/query':>15} {'speedup':>9}")
+    for n_users in sizes:
+        matrix = synthetic_features(n_users)
+        build = time.perf_counter()
+        engine = SimilarityEngine(matrix)
+        build = time.perf_counter() - build
+
+        targets = rng.choice(n_users, size=queries, replace=False)
+        start = time.perf_counter()
+        for t in targets:
+            engine.top_k(t, k)
+        engine_s = (time.perf_counter() - start) / queries
+        legacy_s = legacy_per_user * n_users
+        print(
+            f"{n_users:>8} {legacy_s:>15.3f} {engine_s:>15.5f} {legacy_s / engine_s:>8.0f}x"
+            f"   (engine build {build:.3f}s)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--legacy-sample", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+    main(args.users, args.k, args.legacy_sample, args.queries)